@@ -0,0 +1,291 @@
+# benchmarks/bench_classify.py
+"""
+분류 핫패스 벤치마크.
+
+    python benchmarks/bench_classify.py                   # 전체 실행 + 기존 방식/기준선과 비교
+    python benchmarks/bench_classify.py --quick           # 256px, 구 10/100개만
+    python benchmarks/bench_classify.py --save-baseline   # 현재 결과를 기준선으로 저장
+
+합성 프레임(256px / Basler 원해상도)과 합성 구 집합(10 / 100 / 1k / 10k개)으로
+- 프레임 분류 백엔드: 구 거리 타일(기존 방식) / LUT 직렬 / LUT 병렬 엔진
+- LUT 컴파일, classify_rgb (선형 / 복셀 인덱스 / 배치), rgb_mask, highlight_rgb
+- 디코딩 → 분류 → 인코딩 전체 경로
+를 측정해 ms/frame, 최대 메모리(tracemalloc)를 출력한다.
+속도 향상은 같은 실행에서 잰 기존 방식(구 거리 타일 / 선형 classify_rgb / np.isin 강조) 대비로 항상 출력하고,
+저장된 기준선(--save-baseline)이 있으면 그 대비도 함께 출력한다.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from package.operation import SPHERE_RADIUS, JPEG_QUALITY
+from package.color_lut import ColorLUT, LABEL_NAMES
+from package.sphere_index import SphereIndex
+from package.pixel_engine import PixelEngine
+from package.image_utils import colorize_label_map, highlight_rgb, rgb_mask
+
+BASELINE_PATH = Path(__file__).resolve().with_name("baseline.json")
+FULL_SIZE = (2448, 2048)        # Basler 5MP 원해상도 (w, h)
+SPHERE_COUNTS = (10, 100, 1000, 10000)
+# 기존 구 거리 방식은 (픽셀 × 구) 가 이 값을 넘으면 생략 (수 분 이상 걸림)
+LEGACY_MAX_WORK = 3e9
+# 같은 실행 안에서 비교할 (기존 방식 키 접두어, 새 방식 키 접두어들) — 접두어 뒤가 같은 항목끼리 비교
+REFERENCE_PAIRS = (
+    ("classify_rgb/linear/", ("classify_rgb/index/", "classify_rgb/batch/")),
+    ("frame/sphere_tiles/", ("frame/lut_serial/", "frame/lut_engine/")),
+    ("highlight_isin/", ("rgb_mask/", "highlight_rgb/")),
+)
+
+
+# =========================
+# 합성 데이터
+# =========================
+def make_defs(n, seed=0):
+    """드래그 자취처럼 뭉친 n개의 구를 라벨 3개에 나눠 생성"""
+    rng = np.random.default_rng(seed)
+    labels = [name for name in LABEL_NAMES if name != "unknown"]
+    defs = {label: [] for label in labels}
+    per_stroke = 20
+    for s0 in range(0, n, per_stroke):
+        label = labels[(s0 // per_stroke) % len(labels)]
+        c = rng.integers(0, 256, 3)
+        for _ in range(min(per_stroke, n - s0)):
+            c = np.clip(c + rng.integers(-6, 7, 3), 0, 255)
+            defs[label].append((tuple(int(v) for v in c), SPHERE_RADIUS))
+    return defs
+
+
+def make_frame(w, h, defs, seed=0):
+    """구 중심 근처 색과 무작위 색이 섞인 BGR 프레임"""
+    rng = np.random.default_rng(seed)
+    centers = np.array([c for spheres in defs.values() for c, _ in spheres], dtype=np.int32)
+    # 8x8 블록마다 색 하나 → 실제 사진처럼 공간적으로 뭉친 색
+    bh, bw = (h + 7) // 8, (w + 7) // 8
+    pick = centers[rng.integers(0, len(centers), bh * bw)]
+    noise = rng.integers(-40, 41, (bh * bw, 3))
+    blocks = np.clip(pick + noise, 0, 255).astype(np.uint8).reshape(bh, bw, 3)
+    img = np.repeat(np.repeat(blocks, 8, axis=0), 8, axis=1)[:h, :w]
+    img = np.clip(img.astype(np.int16) + rng.integers(-3, 4, img.shape), 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(img[..., ::-1])     # RGB → BGR
+
+
+# =========================
+# 비교용 구현 (기존 방식)
+# =========================
+def legacy_label_map(img_bgr, defs, tile=256, sphere_chunk=256):
+    """타일 × 구 배치 제곱거리 비교 (LUT 이전 make_pixel_map 방식, int32)"""
+    h, w = img_bgr.shape[:2]
+    img = img_bgr[..., ::-1].astype(np.int32)
+    out = np.zeros((h, w), dtype=np.uint8)
+    # 우선순위 높은 라벨부터 (LABEL_NAMES 인덱스 역순)
+    prepped = []
+    for idx in range(len(LABEL_NAMES) - 1, 0, -1):
+        spheres = defs.get(LABEL_NAMES[idx], [])
+        if spheres:
+            centers = np.array([c for c, _ in spheres], dtype=np.int32)
+            radii2 = np.array([r for _, r in spheres], dtype=np.int32) ** 2
+            prepped.append((idx, centers, radii2))
+
+    for y0 in range(0, h, tile):
+        for x0 in range(0, w, tile):
+            P = img[y0:y0 + tile, x0:x0 + tile].reshape(-1, 3)
+            lab = np.zeros(len(P), dtype=np.uint8)
+            for idx, centers, radii2 in prepped:
+                free = np.flatnonzero(lab == 0)
+                if free.size == 0:
+                    break
+                Pf = P[free]
+                hit = np.zeros(len(Pf), dtype=bool)
+                for s0 in range(0, len(centers), sphere_chunk):
+                    C = centers[s0:s0 + sphere_chunk]
+                    diffs = Pf[:, None, :] - C[None, :, :]
+                    dist2 = np.einsum("ijk,ijk->ij", diffs, diffs)
+                    hit |= np.any(dist2 <= radii2[None, s0:s0 + sphere_chunk], axis=1)
+                lab[free[hit]] = idx
+            th, tw = min(tile, h - y0), min(tile, w - x0)
+            out[y0:y0 + th, x0:x0 + tw] = lab.reshape(th, tw)
+    return out
+
+
+def linear_classify_rgb(rgb, defs):
+    """인덱스 이전 classify_rgb (모든 구를 순회)"""
+    r, g, b = (int(v) for v in rgb)
+    for label, spheres in defs.items():
+        for (cr, cg, cb), radius in spheres:
+            if (r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2 <= radius * radius:
+                return label
+    return "unknown"
+
+
+def legacy_highlight_rgb(img_bgr, rgb_set):
+    """np.isin 구조체 비교 강조 (bitset 이전 highlight_rgb 방식)"""
+    h, w = img_bgr.shape[:2]
+    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    mask = np.isin(
+        img_rgb.reshape(-1, 3).view([("", img_rgb.dtype)] * 3),
+        np.array(list(rgb_set), dtype=np.uint8).view([("", np.uint8)] * 3),
+    ).reshape(h, w)
+    overlay = img_rgb.copy()
+    overlay[mask] = (0, 255, 0)
+    return cv2.cvtColor(overlay, cv2.COLOR_RGB2BGR)
+
+
+# =========================
+# 측정
+# =========================
+def measure(fn, repeat):
+    """fn 반복 실행 → (중앙값 ms, 최대 메모리 MB). 메모리는 별도 1회 실행으로 측정"""
+    fn()    # 워밍업
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.median(times)), peak / 2 ** 20
+
+
+def run_suite(sizes, counts, repeat):
+    results = {}
+
+    def record(key, fn, rep=repeat):
+        ms, mb = measure(fn, rep)
+        results[key] = {"ms": round(ms, 3), "peak_mb": round(mb, 2)}
+        print(f"  {key:<48} {ms:10.2f} ms  {mb:8.1f} MB", flush=True)
+
+    engine = PixelEngine()
+    for n in counts:
+        defs = make_defs(n)
+        print(f"[구 {n}개]")
+        record(f"compile/n={n}", lambda: ColorLUT.compile(defs), rep=1)
+        lut = ColorLUT.compile(defs)
+        index = SphereIndex(defs)
+
+        # classify_rgb: 1000개 점 질의 시간
+        pts = np.random.default_rng(1).integers(0, 256, (1000, 3))
+        record(f"classify_rgb/linear/n={n}/1k pts",
+               lambda: [linear_classify_rgb(p, defs) for p in pts], rep=1)
+        record(f"classify_rgb/index/n={n}/1k pts", lambda: [index.classify(p) for p in pts])
+        record(f"classify_rgb/batch/n={n}/1k pts", lambda: index.classify_batch(pts))
+
+        for w, h in sizes:
+            img = make_frame(w, h, defs)
+            tag = f"{w}x{h}/n={n}"
+            if w * h * n <= LEGACY_MAX_WORK:
+                record(f"frame/sphere_tiles/{tag}", lambda: legacy_label_map(img, defs), rep=1)
+            record(f"frame/lut_serial/{tag}", lambda: lut.classify(img))
+            record(f"frame/lut_engine/{tag}", lambda: engine.classify(lut, img))
+
+    # 구 개수와 무관한 경로는 구 100개 기준으로 한 번만
+    defs = make_defs(100)
+    lut = ColorLUT.compile(defs)
+    print("[highlight / end-to-end]")
+    for w, h in sizes:
+        img = make_frame(w, h, defs)
+        # UI와 같은 형태: (r,g,b) 정수 튜플 집합
+        rgb_set = {tuple(int(v) for v in img[y, x, ::-1])
+                   for y, x in zip(range(0, h, max(1, h // 200)), range(0, w, max(1, w // 200)))}
+        record(f"highlight_isin/{w}x{h}/{len(rgb_set)} colors",
+               lambda: legacy_highlight_rgb(img, rgb_set), rep=1)
+        record(f"rgb_mask/{w}x{h}/{len(rgb_set)} colors", lambda: rgb_mask(img, rgb_set))
+        record(f"highlight_rgb/{w}x{h}/{len(rgb_set)} colors", lambda: highlight_rgb(img, rgb_set))
+
+        jpg = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])[1]
+
+        def end_to_end():
+            frame = cv2.imdecode(jpg, cv2.IMREAD_COLOR)
+            vis = colorize_label_map(engine.classify(lut, frame))
+            cv2.imencode(".png", vis)
+
+        record(f"e2e/decode-classify-encode/{w}x{h}", end_to_end)
+
+    engine.shutdown()
+    return results
+
+
+def speedups(results):
+    """같은 실행의 기존 방식 대비 속도 향상 → {새 방식 키: 배수} (출력 포함)"""
+    print("\n=== 기존 방식 대비 (같은 실행) ===")
+    out = {}
+    for ref_prefix, new_prefixes in REFERENCE_PAIRS:
+        for new_key, cur in results.items():
+            prefix = next((p for p in new_prefixes if new_key.startswith(p)), None)
+            if prefix is None:
+                continue
+            ref_key = ref_prefix + new_key[len(prefix):]
+            ref = results.get(ref_key)
+            if not ref:
+                continue    # 기존 방식을 생략한 크기 (LEGACY_MAX_WORK 초과)
+            speedup = ref["ms"] / cur["ms"] if cur["ms"] else float("inf")
+            out[new_key] = round(speedup, 2)
+            print(f"  {new_key:<48} {ref['ms']:10.2f} → {cur['ms']:10.2f} ms  x{speedup:8.1f}")
+    return out
+
+
+def compare(results, baseline):
+    """기준선 대비 속도 향상 출력"""
+    print("\n=== 기준선 대비 ===")
+    for key, cur in results.items():
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            print(f"  {key:<48} (기준선 없음)")
+            continue
+        speedup = base["ms"] / cur["ms"] if cur["ms"] else float("inf")
+        print(f"  {key:<48} {base['ms']:10.2f} → {cur['ms']:10.2f} ms  x{speedup:6.2f}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="분류 핫패스 벤치마크")
+    ap.add_argument("--quick", action="store_true", help="256px, 구 10/100개만")
+    ap.add_argument("--full-size", default=f"{FULL_SIZE[0]}x{FULL_SIZE[1]}",
+                    help="원해상도 프레임 크기 WxH")
+    ap.add_argument("--repeat", type=int, default=5, help="반복 횟수 (중앙값 사용)")
+    ap.add_argument("--baseline", default=str(BASELINE_PATH), help="기준선 JSON 경로")
+    ap.add_argument("--save-baseline", action="store_true", help="결과를 기준선으로 저장")
+    ap.add_argument("--json", help="결과 JSON 저장 경로")
+    args = ap.parse_args(argv)
+
+    fw, fh = (int(v) for v in args.full_size.lower().split("x"))
+    sizes = [(256, 192)] if args.quick else [(256, 192), (fw, fh)]
+    counts = SPHERE_COUNTS[:2] if args.quick else SPHERE_COUNTS
+
+    results = run_suite(sizes, counts, args.repeat)
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "results": results,
+        "speedups": speedups(results),
+    }
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\n기준선 저장됨 → {baseline_path}")
+    elif baseline_path.exists():
+        compare(results, json.loads(baseline_path.read_text(encoding="utf-8")))
+    else:
+        print(f"\n저장된 기준선 없음 ({baseline_path}) → --save-baseline 으로 저장하면 다음 실행부터 함께 비교")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
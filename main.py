@@ -7,25 +7,31 @@ from PyQt5 import QtWidgets
 from ui.color_definition import PhotoViewer
 # 🎯 색상 정의 불러오기/저장
 from package.color_utils import load_defs, save_defs
+from package.frame_events import EventServer
 
 
 if __name__ == "__main__":
     # ── 실행 시 색상 정의 불러오기
     load_defs()
 
+    # ── PyQt 앱 실행
+    app = QtWidgets.QApplication(sys.argv)
+    win = PhotoViewer()
+
+    # ── 캡처 ↔ UI 이벤트 채널 (폴더 감시 대신 프레임/배치 이벤트 수신)
+    events = EventServer()
+    win.attach_events(events)
+
     # ── 백그라운드 스크립트 실행
     base_dir = os.path.dirname(__file__)
     script_path1 = os.path.join(base_dir, "package", "capture_96_limit.py")
 
     cap_proc = None
     try:
-        cap_proc = subprocess.Popen([sys.executable, script_path1])
+        cap_proc = subprocess.Popen([sys.executable, script_path1], env={**os.environ, **events.env()})
     except Exception as e:
         print(f"⚠️ 캡쳐 프로세스 실행 실패: {e}")
 
-    # ── PyQt 앱 실행
-    app = QtWidgets.QApplication(sys.argv)
-    win = PhotoViewer()
     win.cap_proc = cap_proc   # ✅ UI에서 Exit 버튼으로 안전하게 종료할 수 있도록 전달
     win.show()
     code = app.exec_()
@@ -37,3 +43,4 @@ if __name__ == "__main__":
     if cap_proc and cap_proc.poll() is None:
         cap_proc.terminate()
         print("📷 백그라운드 캡쳐 프로세스 종료됨")
+    events.close()
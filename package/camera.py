@@ -0,0 +1,400 @@
+# package/camera.py
+"""
+카메라 소스 인터페이스.
+
+- PylonCamera: Basler 카메라 (pypylon, 필요할 때만 import)
+- SyntheticCamera: 생성 패턴을 지정 해상도/fps로 내보내는 가상 카메라
+- ReplayCamera: 폴더의 이미지를 지정 fps로 반복 재생
+
+make_source("pylon" | "synthetic[:WxH][@FPS]" | "replay:DIR[@FPS]") 로 생성.
+하드웨어 없이 캡처 → 분류 파이프라인을 부하 테스트할 수 있다.
+"""
+import queue
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from package.frame_io import read_frame
+from package.operation import (
+    CAMERA_BINNING_H, CAMERA_BINNING_V,
+    CAMERA_DECIM_H, CAMERA_DECIM_V,
+    CAMERA_GRAB_MODE, CAMERA_BUFFER_COUNT, CAMERA_FPS,
+    SIM_WIDTH, SIM_HEIGHT, SIM_FPS,
+)
+
+
+class Frame(NamedTuple):
+    img: np.ndarray         # BGR uint8
+    frame_id: int           # 소스가 매기는 프레임 번호
+    timestamp: float        # 호스트 도착 시각 (time.time 기준 초)
+    camera_timestamp: int = 0   # 카메라 타임스탬프 (tick, pylon만)
+
+
+class CameraSource:
+    """카메라 소스 공통 인터페이스"""
+
+    stats = None    # CaptureStats를 붙이면 소스 내부 단계(retrieve/convert) 시간 기록
+    paced = False   # True = 소스가 스스로 프레임 간격을 맞춤 (캡처 루프 sleep 불필요)
+
+    def open(self):
+        pass
+
+    def grab(self, timeout_ms):
+        """다음 프레임 → Frame (실패 시 None, 타임아웃 시 예외)"""
+        raise NotImplementedError
+
+    def begin_batch(self):
+        """배치 촬영 시작 (배치 사이 대기 중 쌓인 프레임이 있으면 버림)"""
+        pass
+
+    def end_batch(self):
+        """배치 촬영 끝 (다음 begin_batch까지는 소비자가 없음)"""
+        pass
+
+    def close(self):
+        pass
+
+    def describe(self):
+        return type(self).__name__
+
+    def pipeline(self):
+        """
+        실제 적용된 촬영 파이프라인 (open 이후 호출).
+        sensor가 None이면 하드웨어 정보가 없는 소스 → 프레임을 최종 카메라 출력으로 취급
+        """
+        return {"sensor": None, "binning": (1, 1), "decimation": (1, 1), "output": None}
+
+
+# =========================
+# Basler (pypylon)
+# =========================
+def _try_set_int_feature(node, value, name):
+    """카메라 정수형 피처를 안전하게 설정"""
+    try:
+        v = int(value)
+        if v <= 1:
+            return
+        node.SetValue(v)
+        print(f"[cam] {name} = {node.GetValue()}")
+    except Exception as e:
+        print(f"[cam] skip {name}: {e}")
+
+
+class PylonCamera(CameraSource):
+    """
+    첫 번째 Basler 카메라 (binning/decimation 시도).
+    - mode="event": ImageEventHandler 콜백이 프레임을 내부 큐에 넣음 → 카메라 프레임레이트/트리거가 타이밍 결정
+                    (큐가 차면 가장 오래된 프레임을 버리고, 촬영 중일 때만 overflow 증가.
+                     배치 사이 대기 중 쌓인 프레임은 begin_batch에서 버림)
+    - mode="poll" : RetrieveResult + LatestImageOnly (캡처 루프가 간격 유지)
+    변환 출력(PylonImage)은 한 번만 만들어 재사용하고, 프레임 번호/카메라 타임스탬프를 Frame에 보존.
+    (GetArray()는 프레임마다 numpy 사본 하나를 만듦 — 프레임이 큐/저장 대기열에서 콜백보다 오래 살기 때문)
+    """
+
+    def __init__(self, mode=CAMERA_GRAB_MODE, buffers=CAMERA_BUFFER_COUNT, fps=CAMERA_FPS):
+        from pypylon import pylon
+        if mode not in ("event", "poll"):
+            raise ValueError(f"알 수 없는 그랩 모드: {mode}")
+        self._pylon = pylon
+        self.mode = mode
+        self.buffers = max(1, int(buffers))
+        self.fps = float(fps or 0)
+        self.paced = mode == "event"
+        self.camera = None
+        self.converter = None
+        self._converted = None      # 재사용하는 변환 출력 PylonImage (numpy 배열은 매번 사본)
+        self._handler = None
+        self._frames = queue.Queue(maxsize=self.buffers)
+        self._last_id = None
+        self.skipped = 0            # 프레임 번호가 건너뛴 수 (카메라/전송 단 누락)
+        self.overflow = 0           # 캡처 루프가 느려 버린 수
+        self._consuming = True      # False = 배치 사이 대기 (큐 넘침은 정상 → overflow 아님)
+
+    def open(self):
+        pylon = self._pylon
+        self.camera = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateFirstDevice())
+        self.converter = self._configure(self.camera)
+        self._converted = pylon.PylonImage()
+        self.camera.MaxNumBuffer.SetValue(self.buffers)
+        if self.mode == "event":
+            self._handler = self._make_handler()
+            self.camera.RegisterImageEventHandler(self._handler, pylon.RegistrationMode_ReplaceAll,
+                                                  pylon.Cleanup_None)
+            self.camera.StartGrabbing(pylon.GrabStrategy_OneByOne,
+                                      pylon.GrabLoop_ProvidedByInstantCamera)
+        else:
+            self.camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
+        print(f"[cam] grab mode = {self.mode}, buffers = {self.buffers}")
+
+    def _configure(self, camera):
+        """binning/decimation/프레임레이트만 시도 (ROI 제외)"""
+        pylon = self._pylon
+        camera.Open()
+
+        # --- Binning ---
+        if hasattr(camera, "BinningHorizontal"):
+            _try_set_int_feature(camera.BinningHorizontal, CAMERA_BINNING_H, "BinningH")
+        if hasattr(camera, "BinningVertical"):
+            _try_set_int_feature(camera.BinningVertical, CAMERA_BINNING_V, "BinningV")
+
+        # --- Decimation ---
+        if hasattr(camera, "DecimationHorizontal"):
+            _try_set_int_feature(camera.DecimationHorizontal, CAMERA_DECIM_H, "DecimationH")
+        if hasattr(camera, "DecimationVertical"):
+            _try_set_int_feature(camera.DecimationVertical, CAMERA_DECIM_V, "DecimationV")
+
+        # --- Frame rate (USB3: AcquisitionFrameRate, GigE: AcquisitionFrameRateAbs) ---
+        if self.fps > 0:
+            try:
+                camera.AcquisitionFrameRateEnable.SetValue(True)
+                node = (camera.AcquisitionFrameRate if hasattr(camera, "AcquisitionFrameRate")
+                        else camera.AcquisitionFrameRateAbs)
+                node.SetValue(self.fps)
+                print(f"[cam] AcquisitionFrameRate = {node.GetValue():.2f}")
+            except Exception as e:
+                print(f"[cam] skip AcquisitionFrameRate: {e}")
+
+        # 픽셀 포맷 컨버터
+        converter = pylon.ImageFormatConverter()
+        converter.OutputPixelFormat = pylon.PixelType_BGR8packed
+        converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
+        return converter
+
+    # -------------------------
+    def _convert(self, grab):
+        """그랩 결과 → Frame (변환 버퍼 재사용, 번호/타임스탬프 보존)"""
+        t0 = time.perf_counter()
+        self.converter.Convert(self._converted, grab)
+        img = self._converted.GetArray()     # 사본: 다음 Convert가 덮어써도 안전
+        if self.stats is not None:
+            self.stats.record("convert", time.perf_counter() - t0)
+
+        frame_id = int(grab.GetImageNumber())
+        if self._last_id is not None and frame_id > self._last_id + 1:
+            gap = frame_id - self._last_id - 1
+            self.skipped += gap
+            if self.stats is not None:
+                self.stats.tick("skipped", gap)
+        self._last_id = frame_id
+        return Frame(img, frame_id, time.time(), int(grab.GetTimeStamp()))
+
+    def _make_handler(self):
+        pylon = self._pylon
+        cam = self
+
+        class _Handler(pylon.ImageEventHandler):
+            # pylon 그랩 스레드에서 호출 → 변환 후 큐에 넣고 바로 반환
+            def OnImageGrabbed(self, camera, grab):
+                try:
+                    if grab.GrabSucceeded():
+                        cam._enqueue(cam._convert(grab))
+                    else:
+                        print(f"⚠️ [cam] 그랩 실패: {grab.GetErrorDescription()}")
+                except Exception as e:
+                    print(f"⚠️ [cam] 콜백 오류: {e}")
+
+        return _Handler()
+
+    def _enqueue(self, frame):
+        try:
+            self._frames.put_nowait(frame)
+        except queue.Full:
+            # 캡처 루프가 느림 → 가장 오래된 프레임을 버리고 최신 유지 (콜백 스레드는 하나뿐)
+            try:
+                self._frames.get_nowait()
+            except queue.Empty:
+                pass
+            self._frames.put_nowait(frame)
+            if self._consuming:
+                self.overflow += 1
+                if self.stats is not None:
+                    self.stats.tick("overflow")
+
+    def begin_batch(self):
+        # 대기 중에 받은 오래된 프레임 제거 → 배치 첫 장부터 요청 이후 프레임
+        while True:
+            try:
+                self._frames.get_nowait()
+            except queue.Empty:
+                break
+        self._consuming = True
+
+    def end_batch(self):
+        self._consuming = False
+
+    def grab(self, timeout_ms):
+        t0 = time.perf_counter()
+        if self.mode == "event":
+            try:
+                frame = self._frames.get(timeout=timeout_ms / 1000)
+            except queue.Empty:
+                raise TimeoutError(f"{timeout_ms}ms 동안 카메라 프레임 없음")
+            if self.stats is not None:
+                self.stats.record("retrieve", time.perf_counter() - t0)
+            return frame
+
+        grab = self.camera.RetrieveResult(timeout_ms, self._pylon.TimeoutHandling_ThrowException)
+        try:
+            if self.stats is not None:
+                self.stats.record("retrieve", time.perf_counter() - t0)
+            if not grab.GrabSucceeded():
+                return None
+            return self._convert(grab)
+        finally:
+            grab.Release()
+
+    def close(self):
+        if self.camera is not None:
+            self.camera.StopGrabbing()
+            self.camera.Close()
+            print(f"[cam] 건너뛴 프레임 번호 {self.skipped}개 / 대기열 초과로 버린 프레임 {self.overflow}장")
+
+    def pipeline(self):
+        """카메라에서 실제 값을 다시 읽음 (설정 실패/무시된 피처 확인용)"""
+        cam = self.camera
+
+        def read(name, default=None):
+            try:
+                return int(getattr(cam, name).GetValue())
+            except Exception:
+                return default
+
+        binning = (read("BinningHorizontal", 1), read("BinningVertical", 1))
+        decimation = (read("DecimationHorizontal", 1), read("DecimationVertical", 1))
+        sensor_w, sensor_h = read("SensorWidth"), read("SensorHeight")
+        if not (sensor_w and sensor_h):
+            # SensorWidth가 없는 모델: WidthMax는 binning/decimation 적용 후 값
+            w_max, h_max = read("WidthMax"), read("HeightMax")
+            if w_max and h_max:
+                sensor_w = w_max * binning[0] * decimation[0]
+                sensor_h = h_max * binning[1] * decimation[1]
+        return {
+            "sensor": (sensor_w, sensor_h) if sensor_w and sensor_h else None,
+            "binning": binning,
+            "decimation": decimation,
+            "output": (read("Width"), read("Height")),
+        }
+
+    def describe(self):
+        return f"pylon (첫 번째 Basler 카메라, {self.mode} 그랩)"
+
+
+# =========================
+# 가상 카메라
+# =========================
+class _Pacer:
+    """fps에 맞춰 다음 프레임 시각까지 대기 (fps <= 0 이면 대기 없음)"""
+
+    def __init__(self, fps):
+        self.period = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = None
+
+    def wait(self):
+        if not self.period:
+            return
+        now = time.perf_counter()
+        if self._next is None or now - self._next > self.period:
+            self._next = now    # 너무 늦으면(소비자가 느림) 기준 재설정
+        else:
+            time.sleep(max(0.0, self._next - now))
+        self._next += self.period
+
+
+class SyntheticCamera(CameraSource):
+    """움직이는 그라디언트 + 색 블롭 패턴 (미리 만든 프레임 몇 장을 순환)"""
+
+    def __init__(self, width=SIM_WIDTH, height=SIM_HEIGHT, fps=SIM_FPS, variants=8, seed=0):
+        self.width, self.height, self.fps = int(width), int(height), fps
+        self._pacer = _Pacer(fps)
+        self.paced = self._pacer.period > 0
+        self._frames = self._make_frames(variants, seed)
+        self._count = 0
+
+    def _make_frames(self, n, seed):
+        rng = np.random.default_rng(seed)
+        h, w = self.height, self.width
+        yy, xx = np.mgrid[0:h, 0:w]
+        frames = []
+        for k in range(n):
+            img = np.empty((h, w, 3), dtype=np.uint8)
+            img[..., 0] = ((xx + k * 16) * 255 // max(1, w)) % 256
+            img[..., 1] = (yy * 255 // max(1, h))
+            img[..., 2] = 128
+            for _ in range(6):
+                cx, cy = int(rng.integers(0, w)), int(rng.integers(0, h))
+                color = tuple(int(v) for v in rng.integers(0, 256, 3))
+                cv2.circle(img, (cx, cy), int(rng.integers(10, max(11, min(h, w) // 6))), color, -1)
+            frames.append(img)
+        return frames
+
+    def grab(self, timeout_ms):
+        self._pacer.wait()
+        img = self._frames[self._count % len(self._frames)].copy()
+        frame = Frame(img, self._count, time.time())
+        self._count += 1
+        return frame
+
+    def describe(self):
+        return f"synthetic {self.width}x{self.height} @ {self.fps or '최대'} fps"
+
+
+class ReplayCamera(CameraSource):
+    """폴더의 이미지를 이름 순으로 반복 재생"""
+
+    EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".npy")
+
+    def __init__(self, directory, fps=SIM_FPS):
+        self.directory = Path(directory)
+        self.fps = fps
+        self._pacer = _Pacer(fps)
+        self.paced = self._pacer.period > 0
+        files = sorted(p for p in self.directory.iterdir() if p.suffix.lower() in self.EXTS)
+        # 디스크/디코딩 비용이 측정에 섞이지 않도록 미리 디코딩
+        self._frames = [np.array(img) for img in map(read_frame, files) if img is not None]
+        if not self._frames:
+            raise FileNotFoundError(f"재생할 이미지가 없습니다: {self.directory}")
+        self._count = 0
+
+    def grab(self, timeout_ms):
+        self._pacer.wait()
+        img = self._frames[self._count % len(self._frames)].copy()
+        frame = Frame(img, self._count, time.time())
+        self._count += 1
+        return frame
+
+    def describe(self):
+        return f"replay {self.directory} ({len(self._frames)}장) @ {self.fps or '최대'} fps"
+
+
+# =========================
+# 생성
+# =========================
+def make_source(spec):
+    """
+    소스 지정 문자열 → CameraSource
+    - "pylon", "pylon:event", "pylon:poll"
+    - "synthetic", "synthetic:1224x1024", "synthetic:1224x1024@30", "synthetic@0" (0 = 최대 속도)
+    - "replay:D:/shots", "replay:D:/shots@10"
+    """
+    kind, _, rest = spec.partition(":")
+    fps = SIM_FPS
+    if "@" in (rest or kind):
+        if rest:
+            rest, _, f = rest.rpartition("@")
+        else:
+            kind, _, f = kind.partition("@")
+        fps = float(f)
+
+    if kind == "pylon":
+        return PylonCamera(mode=rest or CAMERA_GRAB_MODE)
+    if kind == "synthetic":
+        w, h = SIM_WIDTH, SIM_HEIGHT
+        if rest:
+            w, h = (int(v) for v in rest.lower().split("x"))
+        return SyntheticCamera(w, h, fps)
+    if kind == "replay":
+        return ReplayCamera(rest, fps)
+    raise ValueError(f"알 수 없는 카메라 소스: {spec}")
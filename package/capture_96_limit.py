@@ -1,9 +1,9 @@
+import argparse
+import threading
 import time
 from pathlib import Path
 import sys
 import cv2
-from pypylon import pylon
-import shutil
 
 # === 루트 경로 추가 ===
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -13,10 +13,23 @@ if str(ROOT_DIR) not in sys.path:
 # === 설정 import ===
 from package.operation import (
     CAPTURE_COUNT, CAPTURE_TIMEOUT, PICTURE_DIR,
-    JPEG_QUALITY, INTERVAL_SEC,
-    CAMERA_BINNING_H, CAMERA_BINNING_V,
-    CAMERA_DECIM_H, CAMERA_DECIM_V,
+    INTERVAL_SEC, SAVE_JPEG, RING_SLOTS, RING_SLOT_BYTES, STORAGE_FORMAT,
+    CAMERA_SOURCE, CAPTURE_MODE, STREAM_MAX_FILES, STREAM_MAX_BYTES,
+    COLOR_JSON_PATH, DEFECT_MIN_BLOB_AREA, CAPTURE_DOWNSCALE,
+    STATS_INTERVAL, STATS_JSON_PATH,
 )
+from package.camera import make_source
+from package.frame_writer import FrameWriter, RollingWindow
+from package.frame_io import FORMAT_EXT, frame_ext, frame_files, write_meta, reset_dir
+from package.frame_events import (
+    connect_from_env, reset_event, ring_event, frame_event, batch_done_event,
+    evict_event, verdict_event,
+)
+from package.color_lut import ColorLUT
+from package.color_utils import load_lut
+from package.image_utils import make_label_map, label_stats, frame_verdict
+from package.frame_ring import FrameRing
+from package.capture_stats import CaptureStats
 
 # === 기본 설정 ===
 SAVE_DIR  = PICTURE_DIR
@@ -24,101 +37,337 @@ MAX_FILES = CAPTURE_COUNT
 
 
 def ensure_clean_dir(p: Path):
-    """폴더를 아예 비우고 새로 생성"""
-    if p.exists():
-        try:
-            shutil.rmtree(p)
-            print(f"폴더 삭제 완료: {p}")
-        except Exception as e:
-            print(f"폴더 삭제 실패: {e}")
-    p.mkdir(parents=True, exist_ok=True)
+    """폴더를 즉시 비운 새 폴더로 교체 (이전 프레임은 백그라운드에서 삭제 → 바로 촬영 가능)"""
+    reset_dir(p)
     print(f"폴더 새로 생성됨: {p}")
 
 
-def _try_set_int_feature(node, value, name):
-    """카메라 정수형 피처를 안전하게 설정"""
+def frame_path(save_dir, seq, fmt=STORAGE_FORMAT):
+    """프레임 파일 경로 (8자리 일련번호 → 스트리밍에서도 이름 순 = 촬영 순)"""
+    return save_dir / f"frame_{seq:08d}{frame_ext(fmt)}"
+
+
+# =========================
+# 다운스케일
+# =========================
+class Downscaler:
+    """
+    센서 대비 target배 축소 중 하드웨어(binning × decimation)가 못 한 나머지만
+    소프트웨어로 한 번에 축소 (INTER_AREA).
+    첫 프레임에서 실제 크기를 확인하고 세션 파이프라인을 로그로 남김.
+    """
+
+    def __init__(self, source, target=CAPTURE_DOWNSCALE):
+        self.info = source.pipeline()
+        self.target = float(target)
+        self.size = None        # 소프트웨어 축소 후 (w, h), None = 축소 없음
+        self._checked = False
+
+    def _plan(self, img):
+        info = self.info
+        h, w = img.shape[:2]
+        if info["output"] and tuple(info["output"]) != (w, h):
+            print(f"⚠️ [pipeline] 카메라 보고 크기 {info['output'][0]}x{info['output'][1]} ≠ "
+                  f"실제 프레임 {w}x{h} → 실제 크기 기준")
+        if info["sensor"] is None:
+            # 하드웨어 정보 없음 (가상/재생 소스) → 받은 프레임을 그대로 사용
+            print(f"[pipeline] {w}x{h} (센서 정보 없음) → 소프트웨어 축소 없음")
+            return
+        sensor_w, sensor_h = info["sensor"]
+        (bh, bv), (dh, dv) = info["binning"], info["decimation"]
+        # 목표 크기는 센서 기준 → 하드웨어 ROI로 잘린 경우도 같은 배율 유지
+        fx = max(1.0, self.target / (bh * dh))
+        fy = max(1.0, self.target / (bv * dv))
+        if fx > 1.0 or fy > 1.0:
+            self.size = (max(1, round(w / fx)), max(1, round(h / fy)))
+        out_w, out_h = self.size or (w, h)
+        print(f"[pipeline] 센서 {sensor_w}x{sensor_h} → binning {bh}x{bv} → decimation {dh}x{dv}"
+              f" → 카메라 출력 {w}x{h} → 소프트웨어 x{1 / fx:.3g}, x{1 / fy:.3g} → {out_w}x{out_h}")
+
+    def __call__(self, img):
+        if not self._checked:
+            self._checked = True
+            self._plan(img)
+        if self.size is None:
+            return img
+        return cv2.resize(img, self.size, interpolation=cv2.INTER_AREA)
+
+
+def _capture_frame(source, writer, ring, channel, fpath, submit, scale):
+    """
+    한 장 촬영 → (남은 배율만) 축소 → 링 기록/이벤트 → 저장 큐. 드롭되면 False
+    - submit: 링에 기록한 프레임도 writer에 넘길지 (저장 또는 인라인 분류)
+    - 실제 파일 저장 여부는 writer.save (frame 이벤트의 saved로 UI에 전달)
+    """
+    stats = writer.stats
+    t0 = time.perf_counter()
+    frame = source.grab(CAPTURE_TIMEOUT)
+    t1 = time.perf_counter()
+    if frame is None:
+        return True
+    lag = time.time() - frame.timestamp     # 호스트 도착 → 캡처 루프가 꺼낸 시점
+    img = scale(frame.img)
+    if stats is not None:
+        stats.record("grab", t1 - t0)
+        stats.record("latency", lag)
+        stats.record("resize", time.perf_counter() - t1)
+        stats.tick("captured")
+
+    seq = None
+    if ring is not None:
+        seq = ring.write(img, frame.timestamp, frame.frame_id, frame.camera_timestamp)
+    if seq is not None and channel is not None:
+        channel.send(frame_event(fpath, seq, saved=submit and writer.save, frame=frame))
+    if seq is None or submit:
+        return writer.submit(fpath, img)
+    return True
+
+
+def capture_images(source, writer, ring=None, channel=None,
+                   count=MAX_FILES, interval=INTERVAL_SEC, save_dir=SAVE_DIR, scale=None):
+    """
+    폴더 비어있을 때 count장 캡처 (source: package.camera.CameraSource).
+    - ring이 있으면 공유 메모리 링에 먼저 기록하고 바로 UI에 frame 이벤트 전송
+    - 인코딩/저장은 writer 스레드가 비동기로 담당 (ring 사용 시 SAVE_JPEG일 때만)
+    """
+    scale = scale or Downscaler(source)
+    t_start = time.perf_counter()
+    source.begin_batch()
     try:
-        v = int(value)
-        if v <= 1:
+        for i in range(count):
+            t_next = time.perf_counter() + interval
+            if not _capture_frame(source, writer, ring, channel, frame_path(save_dir, i, writer.fmt), SAVE_JPEG, scale):
+                print(f"⚠️ 저장 큐 가득 참 → 프레임 드롭 ({i+1}/{count})")
+
+            # 인코딩/저장 시간과 무관하게 일정 간격 유지
+            remain = t_next - time.perf_counter()
+            if remain > 0:
+                time.sleep(remain)
+    finally:
+        source.end_batch()
+
+    # 배치 완료 = 모든 파일 기록 완료
+    writer.flush()
+    elapsed = time.perf_counter() - t_start
+    print(f"저장 현황: {writer.summary()} / {elapsed:.2f}s → {count / elapsed:.1f} fps")
+
+
+# =========================
+# 스트리밍 모드
+# =========================
+class StreamClassifier:
+    """
+    저장 스레드에서 프레임마다 바로 분류 (배치 사이 정지 없음).
+    color_defs.json이 바뀌면(UI에서 확정) 다음 프레임부터 새 정의로 분류.
+    - 정의는 전역 COLOR_DEFS가 아닌 전용 LUT로 컴파일해 참조만 교체
+      (다른 저장 워커가 분류 중인 LUT는 바뀌지 않음)
+    """
+
+    def __init__(self, channel=None, defs_path=COLOR_JSON_PATH, stats=None):
+        self.channel = channel
+        self.stats = stats
+        self.defs_path = Path(defs_path)
+        self.classified = 0
+        self.ng = 0
+        self.lut = ColorLUT()          # 정의 파일을 읽기 전엔 전부 unknown
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self):
+        try:
+            mtime = self.defs_path.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
             return
-        node.SetValue(v)
-        print(f"[cam] {name} = {node.GetValue()}")
-    except Exception as e:
-        print(f"[cam] skip {name}: {e}")
-
-
-def configure_camera(camera: pylon.InstantCamera):
-    """binning/decimation만 시도 (ROI 제외)"""
-    camera.Open()
-
-    # --- Binning ---
-    if hasattr(camera, "BinningHorizontal"):
-        _try_set_int_feature(camera.BinningHorizontal, CAMERA_BINNING_H, "BinningH")
-    if hasattr(camera, "BinningVertical"):
-        _try_set_int_feature(camera.BinningVertical, CAMERA_BINNING_V, "BinningV")
-
-    # --- Decimation ---
-    if hasattr(camera, "DecimationHorizontal"):
-        _try_set_int_feature(camera.DecimationHorizontal, CAMERA_DECIM_H, "DecimationH")
-    if hasattr(camera, "DecimationVertical"):
-        _try_set_int_feature(camera.DecimationVertical, CAMERA_DECIM_V, "DecimationV")
-
-    # 픽셀 포맷 컨버터
-    converter = pylon.ImageFormatConverter()
-    converter.OutputPixelFormat = pylon.PixelType_BGR8packed
-    converter.OutputBitAlignment = pylon.OutputBitAlignment_MsbAligned
-    return converter
-
-
-def capture_images(camera, converter):
-    """폴더 비어있을 때 MAX_FILES장 캡처"""
-    for i in range(MAX_FILES):
-        grab = camera.RetrieveResult(CAPTURE_TIMEOUT, pylon.TimeoutHandling_ThrowException)
-        if grab.GrabSucceeded():
-            img = converter.Convert(grab).GetArray()
-
-            # 🔥 binning/decimation 안 먹힐 때 대비 → 소프트웨어 다운스케일 추가
-            img = cv2.resize(
-                img,
-                (img.shape[1] // 2, img.shape[0] // 2),
-                interpolation=cv2.INTER_AREA
-            )
-
-            fname = f"frame_{i:03d}.jpg"
-            fpath = SAVE_DIR / fname
-            cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])[1].tofile(str(fpath))
-            print(f"저장됨: {fpath} ({i+1}/{MAX_FILES})")
-        grab.Release()
-        time.sleep(INTERVAL_SEC)
-
-
-def main():
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            lut = load_lut(self.defs_path)
+            if lut is None:
+                return      # 읽기 실패 → _mtime 그대로 두고 다음 프레임에 재시도
+            self.lut = lut
+            self._mtime = mtime
+            print(f"색상 정의 불러옴 ← {self.defs_path}")
+
+    def __call__(self, path, img):
+        self._reload()
+        lut = self.lut
+        t0 = time.perf_counter()
+        stats = label_stats(make_label_map(img, lut), min_area=DEFECT_MIN_BLOB_AREA)
+        verdict = frame_verdict(stats)
+        if self.stats is not None:
+            self.stats.record("classify", time.perf_counter() - t0)
+            self.stats.tick("classified")
+        with self._lock:
+            self.classified += 1
+            self.ng += verdict == "NG"
+        if self.channel is not None:
+            self.channel.send(verdict_event(path, verdict, stats))   # UI가 표시
+        elif verdict == "NG":
+            print(f"❌ NG: {path.name} (불량 {stats.defect_ratio:.2%}, 영역 {stats.defect_blobs}개)")
+
+
+def stream_images(source, writer, ring=None, channel=None,
+                  interval=INTERVAL_SEC, save_dir=SAVE_DIR, scale=None, report_every=100):
+    """
+    무한 촬영 (Ctrl+C 또는 UI 종료까지).
+    - 파일명은 누적 일련번호, 오래된 파일은 writer 쪽 RollingWindow가 삭제
+    - 분류는 writer.on_frame(StreamClassifier)이 저장 스레드에서 수행
+    """
+    scale = scale or Downscaler(source)
+    seq = dropped = 0
+    t_start = time.perf_counter()
+    while True:
+        t_next = time.perf_counter() + interval
+        if not _capture_frame(source, writer, ring, channel, frame_path(save_dir, seq, writer.fmt), True, scale):
+            dropped += 1
+            print(f"⚠️ 저장/분류 큐 가득 참 → 프레임 드롭 (#{seq}, 누적 {dropped})")
+        seq += 1
+
+        if seq % report_every == 0:
+            elapsed = time.perf_counter() - t_start
+            print(f"스트리밍: {seq}장 / {elapsed:.1f}s → {seq / elapsed:.1f} fps, {writer.summary()}")
+
+        remain = t_next - time.perf_counter()
+        if remain > 0:
+            time.sleep(remain)
+
+
+def _wait_for_request(channel):
+    """UI의 촬영 요청 대기. 채널이 끊기면 False"""
+    try:
+        while True:
+            event = channel.recv()
+            if event.get("type") == "capture":
+                return True
+    except (EOFError, OSError):
+        return False
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="카메라 캡처 → picture 폴더 저장")
+    ap.add_argument("--source", default=CAMERA_SOURCE,
+                    help='카메라 소스: "pylon", "synthetic[:WxH][@FPS]", "replay:DIR[@FPS]"')
+    ap.add_argument("--save-dir", type=Path, default=SAVE_DIR, help="저장 폴더")
+    ap.add_argument("--count", type=int, default=MAX_FILES, help="배치당 촬영 장수")
+    ap.add_argument("--interval", type=float, default=None,
+                    help="촬영 간격(초), 0 = 소스가 내주는 대로 최대 속도 "
+                         "(기본: 소스가 스스로 간격을 맞추면 0, 아니면 INTERVAL_SEC)")
+    ap.add_argument("--once", action="store_true", help="배치 하나만 촬영하고 종료 (부하 테스트용)")
+    ap.add_argument("--stats-interval", type=float, default=STATS_INTERVAL,
+                    help="단계별 지연/fps 요약 출력 주기(초), 0 = 끔")
+    ap.add_argument("--stats-json", default=str(STATS_JSON_PATH),
+                    help="단계별 통계 JSON 파일 (빈 문자열 = 기록 안 함)")
+    ap.add_argument("--downscale", type=float, default=CAPTURE_DOWNSCALE,
+                    help="센서 대비 최종 축소 배율 (하드웨어 binning/decimation 부족분만 소프트웨어로)")
+    ap.add_argument("--format", choices=list(FORMAT_EXT), default=STORAGE_FORMAT,
+                    help="저장 포맷: jpeg / png(무손실) / npy(무압축, 디코딩 없음)")
+    ap.add_argument("--stream", action="store_true", default=CAPTURE_MODE == "stream",
+                    help="연속 촬영 + 인라인 분류 (롤링 윈도로 디스크 사용량 제한)")
+    ap.add_argument("--max-files", type=int, default=STREAM_MAX_FILES,
+                    help="스트리밍: 보관할 최대 프레임 수 (0 = 제한 없음)")
+    ap.add_argument("--max-bytes", type=int, default=STREAM_MAX_BYTES,
+                    help="스트리밍: 보관할 최대 총 바이트 (0 = 제한 없음)")
+    args = ap.parse_args(argv)
+    save_dir = args.save_dir
+
     # ✅ 실행 시 폴더 비우고 새로 생성
-    ensure_clean_dir(SAVE_DIR)
+    ensure_clean_dir(save_dir)
+    write_meta(save_dir, args.format)
+
+    # UI 이벤트 채널 (main.py에서 실행된 경우) → 폴더 감시 대신 이벤트로 동작
+    channel = connect_from_env()
+    ring = None
+    if channel is not None:
+        channel.send(reset_event())
+        # 공유 메모리 링 → UI가 JPEG 디코딩 없이 프레임을 바로 읽음
+        try:
+            ring = FrameRing.create(RING_SLOTS, RING_SLOT_BYTES)
+            channel.send(ring_event(ring.name))
+        except Exception as e:
+            print(f"⚠️ 공유 메모리 링 생성 실패 → JPEG 전달만 사용: {e}")
 
     # 카메라 준비
-    camera = pylon.InstantCamera(pylon.TlFactory.GetInstance().CreateFirstDevice())
-    converter = configure_camera(camera)
-    camera.StartGrabbing(pylon.GrabStrategy_LatestImageOnly)
+    source = make_source(args.source)
+    stats = CaptureStats()
+    source.stats = stats
+    source.open()
+    print(f"카메라 소스: {source.describe()}")
+    scale = Downscaler(source, args.downscale)
+    if args.interval is None:
+        # 카메라 프레임레이트/트리거(또는 가상 소스 fps)가 타이밍을 정하면 루프에서 sleep 하지 않음
+        args.interval = 0.0 if source.paced else INTERVAL_SEC
+    # 링이 없을 때만 파일 기록 완료 시점에 frame 이벤트 전송
+    notify = channel is not None and ring is None
+    if args.stream:
+        window = RollingWindow(args.max_files, args.max_bytes)
 
-    print("실행 시작: 폴더 감시 중...")
+        def on_written(path):
+            if notify:
+                channel.send(frame_event(path))
+            evicted = window.add(path)
+            if evicted and channel is not None:
+                channel.send(evict_event(evicted))
+
+        # 링으로 UI에 전달 중이고 SAVE_JPEG가 꺼져 있으면 분류만 하고 저장은 생략
+        classifier = StreamClassifier(channel, stats=stats)
+        writer = FrameWriter(on_written=on_written, on_frame=classifier,
+                             save=ring is None or SAVE_JPEG, fmt=args.format, stats=stats)
+    else:
+        writer = FrameWriter(
+            on_written=(lambda path: channel.send(frame_event(path))) if notify else None,
+            fmt=args.format,
+            stats=stats,
+        )
+    stats.start(args.stats_interval, args.stats_json)
 
     try:
-        while True:
-            files = list(SAVE_DIR.glob("*.jpg"))
-            if len(files) == 0:
-                print("폴더 비어 있음 → 촬영 시작")
-                time.sleep(1)
-                capture_images(camera, converter)
-                print(f"{MAX_FILES}장 촬영 완료 → 대기 모드")
-            else:
-                time.sleep(1)
+        if args.stream:
+            print(f"스트리밍 시작: 최대 {args.max_files or '∞'}장 / "
+                  f"{args.max_bytes // 1024 ** 2 if args.max_bytes else '∞'} MB 보관")
+            stream_images(source, writer, ring, channel, args.interval, save_dir, scale)
+        elif channel is not None:
+            print("실행 시작: UI 이벤트 채널 연결됨")
+            # 시작 시 폴더를 비웠으므로 첫 배치는 바로 촬영
+            while True:
+                print("촬영 시작")
+                capture_images(source, writer, ring, channel, args.count, args.interval, save_dir, scale)
+                channel.send(batch_done_event(args.count))
+                print(f"{args.count}장 촬영 완료 → 촬영 요청 대기")
+                if args.once or not _wait_for_request(channel):
+                    print("UI 연결 종료.")
+                    break
+        elif args.once:
+            capture_images(source, writer, count=args.count, interval=args.interval,
+                           save_dir=save_dir, scale=scale)
+        else:
+            print("실행 시작: 폴더 감시 중...")
+            while True:
+                files = frame_files(save_dir)
+                if len(files) == 0:
+                    print("폴더 비어 있음 → 촬영 시작")
+                    time.sleep(1)
+                    capture_images(source, writer, count=args.count, interval=args.interval,
+                                   save_dir=save_dir, scale=scale)
+                    print(f"{args.count}장 촬영 완료 → 대기 모드")
+                else:
+                    time.sleep(1)
 
     except KeyboardInterrupt:
         print("사용자 중지 요청.")
     finally:
-        camera.StopGrabbing()
-        camera.Close()
+        source.close()
+        writer.close()
+        stats.close(args.stats_json)
+        if args.stream:
+            print(f"분류 현황: {classifier.classified}장 (NG {classifier.ng}장), "
+                  f"삭제된 오래된 프레임 {window.evicted}장")
+        if channel is not None:
+            channel.close()
+        if ring is not None:
+            ring.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+# package/capture_stats.py
+"""
+캡처 프로세스 단계별 지연/처리량 계측.
+
+- record(stage, sec): 단계 소요 시간 기록 (최근 window개만 유지 → 롤링 p50/p95/p99)
+- tick(name): 이벤트 발생 시각 기록 (최근 window개 → 롤링 fps)
+- start(interval, json_path): interval초마다 한 줄 요약 출력 + JSON 파일 갱신
+
+단계: grab(소스 호출 전체) / retrieve·convert(pylon) / resize / queue(저장 대기) / encode / write
+→ grab이 길면 카메라 병목, resize·encode가 길면 CPU 병목, queue·write가 길면 디스크 병목.
+"""
+import collections
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from package.operation import STATS_WINDOW, STATS_INTERVAL, STATS_JSON_PATH
+
+PERCENTILES = (50, 95, 99)
+
+
+class CaptureStats:
+    """여러 스레드(캡처 루프, 저장 워커)에서 동시에 기록해도 안전"""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.window = max(2, int(window))
+        self._durations = {}        # stage → deque[초]
+        self._ticks = {}            # name → deque[perf_counter]
+        self._totals = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = time.time()
+
+    # -------------------------
+    # 기록
+    # -------------------------
+    def record(self, stage, seconds):
+        with self._lock:
+            q = self._durations.get(stage)
+            if q is None:
+                q = self._durations[stage] = collections.deque(maxlen=self.window)
+            q.append(seconds)
+
+    def tick(self, name, n=1):
+        now = time.perf_counter()
+        with self._lock:
+            q = self._ticks.get(name)
+            if q is None:
+                q = self._ticks[name] = collections.deque(maxlen=self.window)
+            q.append(now)
+            self._totals[name] += n
+
+    # -------------------------
+    # 집계
+    # -------------------------
+    def snapshot(self):
+        """{"stages": {stage: {n, mean_ms, p50_ms, ...}}, "rates": {name: {total, fps}}}"""
+        with self._lock:
+            durations = {k: np.fromiter(q, dtype=np.float64) for k, q in self._durations.items()}
+            ticks = {k: (q[0], q[-1], len(q)) for k, q in self._ticks.items() if q}
+            totals = dict(self._totals)
+
+        stages = {}
+        for name, d in durations.items():
+            if not d.size:
+                continue
+            ms = d * 1000.0
+            entry = {"n": int(d.size), "mean_ms": round(float(ms.mean()), 3)}
+            for p, v in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+                entry[f"p{p}_ms"] = round(float(v), 3)
+            entry["max_ms"] = round(float(ms.max()), 3)
+            stages[name] = entry
+
+        rates = {}
+        for name, total in totals.items():
+            first, last, n = ticks.get(name, (0.0, 0.0, 0))
+            fps = (n - 1) / (last - first) if n > 1 and last > first else 0.0
+            rates[name] = {"total": int(total), "fps": round(fps, 2)}
+
+        return {"time": time.time(), "uptime_s": round(time.time() - self.started, 1),
+                "window": self.window, "stages": stages, "rates": rates}
+
+    def line(self, snap=None):
+        """사람이 읽는 한 줄 요약"""
+        snap = snap or self.snapshot()
+        rates = " ".join(f"{k} {v['fps']:.1f}fps({v['total']})" for k, v in snap["rates"].items())
+        stages = " | ".join(
+            f"{k} {v['p50_ms']:.1f}/{v['p95_ms']:.1f}/{v['p99_ms']:.1f}"
+            for k, v in snap["stages"].items()
+        )
+        return f"[stats] {rates} || p50/p95/p99 ms: {stages}"
+
+    def dump(self, path, snap=None):
+        """JSON 파일로 기록 (임시 파일 → os.replace, 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록)"""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(snap or self.snapshot(), ensure_ascii=False, indent=2),
+                           encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ 통계 파일 저장 실패: {e}")
+
+    # -------------------------
+    # 주기 보고
+    # -------------------------
+    def start(self, interval=STATS_INTERVAL, json_path=STATS_JSON_PATH):
+        """interval초마다 요약 출력 + JSON 갱신 (interval <= 0 이면 끔)"""
+        if interval <= 0 or self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.report(json_path)
+
+        self._thread = threading.Thread(target=run, name="capture-stats", daemon=True)
+        self._thread.start()
+
+    def report(self, json_path=STATS_JSON_PATH):
+        snap = self.snapshot()
+        print(self.line(snap))
+        if json_path:
+            self.dump(json_path, snap)
+
+    def close(self, json_path=STATS_JSON_PATH):
+        """보고 스레드 종료 + 마지막 통계 기록"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.report(json_path)
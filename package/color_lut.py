@@ -0,0 +1,169 @@
+# package/color_lut.py
+import os
+from pathlib import Path
+import numpy as np
+
+# =========================
+# 라벨 인덱스 (값이 클수록 우선순위 높음)
+# =========================
+# 우선순위: product > defect > background > unknown
+LABEL_NAMES = ("unknown", "background", "defect", "product")
+LABEL_INDEX = {name: i for i, name in enumerate(LABEL_NAMES)}
+LUT_SIDE = 256
+
+# 사이드카 캐시 파일 포맷: [magic 8B][sha256 키 32B][패딩] + 256³ 테이블
+LUT_MAGIC = b"VSLUT001"
+LUT_HEADER_SIZE = 64
+
+_BALL_CACHE = {}
+
+
+# =========================
+# 유틸
+# =========================
+def _ball(radius):
+    """반경 radius 구에 포함되는 격자점 마스크 (2r+1)^3 bool (반경별 캐시)"""
+    ball = _BALL_CACHE.get(radius)
+    if ball is None:
+        d = np.arange(-radius, radius + 1, dtype=np.int32)
+        dist2 = d[:, None, None] ** 2 + d[None, :, None] ** 2 + d[None, None, :] ** 2
+        ball = dist2 <= radius * radius
+        _BALL_CACHE[radius] = ball
+    return ball
+
+
+def _read_key(path):
+    """사이드카 파일 헤더의 키 (형식/크기가 맞지 않으면 None)"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(LUT_HEADER_SIZE)
+        if Path(path).stat().st_size != LUT_HEADER_SIZE + LUT_SIDE ** 3:
+            return None
+    except OSError:
+        return None
+    if header[:len(LUT_MAGIC)] != LUT_MAGIC:
+        return None
+    return header[len(LUT_MAGIC):len(LUT_MAGIC) + 32]
+
+
+def clip_sphere(center, radius):
+    """
+    구의 바운딩 큐브를 RGB 공간(0~255)으로 자른 결과.
+    - (dst 슬라이스, 잘린 구 마스크) 반환, 큐브가 완전히 밖이면 None
+    """
+    rad = abs(int(radius))
+    ball = _ball(rad)
+    src, dst = [], []
+    for c in center:
+        c0 = int(c) - rad
+        a = max(c0, 0)
+        b = min(c0 + 2 * rad + 1, LUT_SIDE)
+        if a >= b:
+            return None
+        dst.append(slice(a, b))
+        src.append(slice(a - c0, b - c0))
+    return tuple(dst), ball[tuple(src)]
+
+
+def pack_rgb24(img_bgr):
+    """BGR uint8 이미지 → (h,w) int32 packed RGB (r<<16 | g<<8 | b)"""
+    packed = img_bgr[..., 2].astype(np.int32)
+    packed <<= 8
+    packed |= img_bgr[..., 1]
+    packed <<= 8
+    packed |= img_bgr[..., 0]
+    return packed
+
+
+# =========================
+# 컴파일된 분류기
+# =========================
+class ColorLUT:
+    """
+    색상 구(Sphere) 정의를 256³ uint8 라벨 LUT로 컴파일한 분류기.
+    - table[r, g, b] = LABEL_NAMES 인덱스 (0 = unknown)
+    - 겹치는 구는 인덱스가 큰 라벨(우선순위 높은 라벨)이 차지
+    - 분류는 packed RGB 한 번의 gather → 구 개수와 무관한 비용
+    """
+
+    def __init__(self):
+        self.table = np.zeros((LUT_SIDE, LUT_SIDE, LUT_SIDE), dtype=np.uint8)
+
+    @classmethod
+    def compile(cls, defs):
+        """{label: [(center, radius), ...]} → ColorLUT"""
+        lut = cls()
+        for label, spheres in defs.items():
+            for center, radius in spheres:
+                lut.add_sphere(label, center, radius)
+        return lut
+
+    def add_sphere(self, label, center, radius):
+        """구 하나의 바운딩 큐브만 래스터화 (우선순위 낮은 칸만 덮어씀)"""
+        idx = LABEL_INDEX.get(label, 0)
+        if idx == 0:
+            # make_pixel_map 이 다루지 않는 라벨은 무시
+            return
+        clipped = clip_sphere(center, radius)
+        if clipped is None:
+            return  # 큐브가 RGB 공간 밖
+        dst, ball = clipped
+
+        if not self.table.flags.writeable:
+            # 읽기 전용 memmap → 첫 수정 시 개인 사본으로 전환
+            self.table = np.array(self.table)
+
+        view = self.table[dst]
+        hit = ball & (view < idx)
+        view[hit] = idx
+
+    def copy(self):
+        """같은 내용의 독립된 ColorLUT (원본 memmap/테이블은 건드리지 않음)"""
+        lut = ColorLUT.__new__(ColorLUT)
+        lut.table = np.array(self.table)
+        return lut
+
+    def classify(self, img_bgr, out=None):
+        """BGR uint8 이미지 → (h,w) uint8 라벨 인덱스 맵 (out 지정 시 그 버퍼에 기록)"""
+        if out is None:
+            out = np.empty(img_bgr.shape[:2], dtype=np.uint8)
+        return np.take(self.table.reshape(-1), pack_rgb24(img_bgr), out=out)
+
+    # -------------------------
+    # 사이드카 캐시 (memmap)
+    # -------------------------
+    def save(self, path, key):
+        """테이블을 key(32B)와 함께 path에 원자적으로 기록 (임시 파일 → os.replace)"""
+        path = Path(path)
+        if _read_key(path) == key:
+            return True  # 같은 내용이 이미 기록됨 (매핑 중인 파일을 덮어쓰지 않음)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        header = (LUT_MAGIC + key).ljust(LUT_HEADER_SIZE, b"\0")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(header)
+                f.write(np.ascontiguousarray(self.table).data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            # 다른 프로세스가 매핑 중(Windows) 이거나 쓰기 불가 → 캐시 없이 진행
+            print(f"⚠️ LUT 캐시 저장 실패: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return False
+
+    @classmethod
+    def open(cls, path, key):
+        """path의 키가 일치하면 읽기 전용 memmap으로 연 ColorLUT, 아니면 None"""
+        path = Path(path)
+        if _read_key(path) != key:
+            return None
+
+        lut = cls.__new__(cls)
+        lut.table = np.memmap(path, dtype=np.uint8, mode="r", offset=LUT_HEADER_SIZE,
+                              shape=(LUT_SIDE, LUT_SIDE, LUT_SIDE))
+        return lut
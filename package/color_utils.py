@@ -1,6 +1,13 @@
+import hashlib
 import json
+import os
+import threading
 from pathlib import Path
 from package.operation import COLOR_JSON_PATH, SPHERE_RADIUS
+import math
+import numpy as np
+from package.color_lut import ColorLUT, LUT_MAGIC, LUT_SIDE, clip_sphere
+from package.sphere_index import SphereIndex
 
 # =========================
 # 전역 저장소 & 파일 경로
@@ -12,6 +19,14 @@ COLOR_DEFS = {
 }
 SAVE_FILE = COLOR_JSON_PATH
 
+# COLOR_DEFS 변경 카운터 & 컴파일된 LUT 캐시
+# - COLOR_DEFS/LUT 변경은 _DEFS_LOCK 안에서만 (GUI 스레드 ↔ 분류 워커 스레드)
+# - 한 번 공개한 LUT는 수정하지 않음 (변경은 사본에 반영 후 교체) → 워커가 쥔 LUT는 항상 일관
+_DEFS_LOCK = threading.RLock()
+_DEFS_VERSION = 0
+_LUT_CACHE = {"version": -1, "lut": None}
+_INDEX_CACHE = {"version": -1, "index": None}
+
 
 # =========================
 # 유틸
@@ -31,6 +46,38 @@ def _is_iter_of_rgb(x):
         return False
 
 
+def _lut_path(filepath):
+    """color_defs.json 옆 사이드카 LUT 캐시 경로 (예: color_defs.lut)"""
+    return Path(filepath).with_suffix(".lut")
+
+
+def _defs_key(raw):
+    """JSON 원본 바이트 + LUT 포맷 → 캐시 키 (sha256)"""
+    return hashlib.sha256(LUT_MAGIC + raw).digest()
+
+
+def _touch_defs(added=None, cleared=False):
+    """
+    COLOR_DEFS가 바뀌었음을 표시 (호출 측이 _DEFS_LOCK 보유).
+    - 컴파일된 LUT가 최신이면 사본에 추가분(added)/초기화(cleared)만 증분 반영 후 교체
+    - 그 외 변경은 캐시 무효화 → 다음 lut_snapshot() 때 재컴파일
+    """
+    global _DEFS_VERSION
+    lut = _LUT_CACHE["lut"]
+    in_sync = lut is not None and _LUT_CACHE["version"] == _DEFS_VERSION
+    _DEFS_VERSION += 1
+    if not in_sync or (added is None and not cleared):
+        return
+    if cleared:
+        lut = ColorLUT()    # 빈 테이블 (전부 unknown)
+    elif added:
+        lut = lut.copy()
+    for label, center, radius in added or ():
+        lut.add_sphere(label, center, radius)
+    _LUT_CACHE["lut"] = lut
+    _LUT_CACHE["version"] = _DEFS_VERSION
+
+
 # =========================
 # 기능 함수
 # =========================
@@ -49,10 +96,19 @@ def add_color_def(label, center_rgb, radius=SPHERE_RADIUS, defs=None):
     - center_rgb: (r,g,b) 또는 {(r,g,b), ...} / [(r,g,b), ...]
     """
     target = COLOR_DEFS if defs is None else defs
+    if target is COLOR_DEFS:
+        with _DEFS_LOCK:
+            _add_color_def(target, label, center_rgb, radius)
+    else:
+        _add_color_def(target, label, center_rgb, radius)
+
+
+def _add_color_def(target, label, center_rgb, radius):
     if label not in target:
         target[label] = []
 
     rad = int(radius)
+    start = len(target[label])
 
     # 여러 RGB가 들어온 경우
     if _is_iter_of_rgb(center_rgb):
@@ -70,43 +126,260 @@ def add_color_def(label, center_rgb, radius=SPHERE_RADIUS, defs=None):
         # 단일 RGB
         target[label].append((_to_rgb_tuple(center_rgb), rad))
 
+    if target is COLOR_DEFS:
+        # 컴파일된 LUT에는 새로 추가된 구만 래스터화
+        _touch_defs(added=[(label, c, r) for c, r in target[label][start:]])
+
+
+def _classify_linear(rgb, defs):
+    """구 목록 전체를 정의 순서대로 검사 (인덱스를 만들 가치가 없는 일회성 질의용)"""
+    r, g, b = _to_rgb_tuple(rgb)
+    for label, spheres in defs.items():
+        for center, radius in spheres:
+            cr, cg, cb = _to_rgb_tuple(center)
+            dr, dg, db = r - cr, g - cg, b - cb
+            if (dr * dr + dg * dg + db * db) <= int(radius) * int(radius):
+                return label
+    return "unknown"
+
+
+def _get_index(defs=None):
+    """COLOR_DEFS(캐시) 또는 주어진 defs의 SphereIndex"""
+    if defs is not None and defs is not COLOR_DEFS:
+        return SphereIndex(defs)
+    with _DEFS_LOCK:
+        if _INDEX_CACHE["version"] != _DEFS_VERSION:
+            _INDEX_CACHE["index"] = SphereIndex(COLOR_DEFS)
+            _INDEX_CACHE["version"] = _DEFS_VERSION
+        return _INDEX_CACHE["index"]
+
 
 def classify_rgb(rgb, defs=None):
     """
     RGB값이 어떤 색상 정의 구 안에 포함되는지 분류.
-    - 오버플로 방지를 위해 모두 int로 변환 후 제곱거리로 비교
+    - 복셀 격자 인덱스로 해당 셀의 후보 구만 정수 제곱거리로 비교
+    - 결과는 defs 순서대로 처음 포함되는 라벨 (없으면 "unknown")
+    - 전역이 아닌 defs는 인덱스를 만들지 않고 선형 검사 (호출마다 인덱스 구축 비용 회피)
     """
-    target = COLOR_DEFS if defs is None else defs
-    r, g, b = _to_rgb_tuple(rgb)
+    if defs is not None and defs is not COLOR_DEFS:
+        return _classify_linear(rgb, defs)
+    return _get_index(defs).classify(rgb)
 
-    for label, spheres in target.items():
-        for center, radius in spheres:
-            cr, cg, cb = _to_rgb_tuple(center)
-            rad2 = int(radius) * int(radius)
 
-            dr = r - cr
-            dg = g - cg
-            db = b - cb
+def classify_rgb_batch(points, defs=None):
+    """(N,3) RGB 배열을 classify_rgb와 같은 규칙으로 한 번에 분류 → (N,) 라벨 배열"""
+    return _get_index(defs).classify_batch(points)
+
+
+def _open_or_compile(filepath, raw, defs):
+    """사이드카 LUT 키가 raw와 일치하면 memmap으로 열고, 아니면 defs를 컴파일 후 기록"""
+    key = _defs_key(raw)
+    lut = ColorLUT.open(_lut_path(filepath), key)
+    if lut is None:
+        lut = ColorLUT.compile(defs)
+        lut.save(_lut_path(filepath), key)
+    return lut
+
+
+def _attach_lut(filepath, raw):
+    """filepath(raw)에서 불러온 COLOR_DEFS의 LUT를 캐시에 연결"""
+    lut = _open_or_compile(filepath, raw, COLOR_DEFS)
+    _LUT_CACHE["lut"] = lut
+    _LUT_CACHE["version"] = _DEFS_VERSION
 
-            if (dr * dr + dg * dg + db * db) <= rad2:
-                return label
-    return "unknown"
+
+def defs_version():
+    """COLOR_DEFS 변경 카운터 (정의가 바뀔 때마다 증가 → 분류 결과 캐시 키)"""
+    return _DEFS_VERSION
+
+
+def lut_snapshot():
+    """
+    (정의 버전, 그 버전을 컴파일한 ColorLUT). 어느 스레드에서 불러도 안전.
+    - 반환된 LUT는 이후 정의가 바뀌어도 수정되지 않음 → 워커에 그대로 넘겨 사용
+    - 정의가 바뀐 경우에만 재컴파일 (정의 사본을 떠서 락 밖에서 컴파일)
+    """
+    with _DEFS_LOCK:
+        version = _DEFS_VERSION
+        if _LUT_CACHE["version"] == version:
+            return version, _LUT_CACHE["lut"]
+        defs = {label: list(spheres) for label, spheres in COLOR_DEFS.items()}
+    lut = ColorLUT.compile(defs)
+    with _DEFS_LOCK:
+        if _DEFS_VERSION == version:
+            _LUT_CACHE["lut"] = lut
+            _LUT_CACHE["version"] = version
+    return version, lut
+
+
+def get_compiled_lut():
+    """현재 COLOR_DEFS를 컴파일한 ColorLUT (정의가 바뀐 경우에만 재컴파일)"""
+    return lut_snapshot()[1]
+
+
+# =========================
+# 구 집합 압축
+# =========================
+def _coverage_update(cov, sphere, delta):
+    """커버리지 카운트 격자에 구 하나를 더하거나(+1) 뺌(-1)"""
+    clipped = clip_sphere(*sphere)
+    if clipped is not None:
+        dst, ball = clipped
+        view = cov[dst]
+        if delta > 0:
+            view[ball] += 1
+        else:
+            view[ball] -= 1
+
+
+def _enclosing_sphere(a, b):
+    """두 구를 모두 감싸는 정수 중심/반경의 구"""
+    (ca, ra), (cb, rb) = a, b
+    ca, cb = np.array(ca, dtype=float), np.array(cb, dtype=float)
+    d = float(np.linalg.norm(cb - ca))
+    if d + rb <= ra:
+        return a
+    if d + ra <= rb:
+        return b
+    R = (d + ra + rb) / 2.0
+    center = ca + (R - ra) / d * (cb - ca)
+    center = tuple(int(round(v)) for v in center)
+    rad = max(math.dist(center, ca) + ra, math.dist(center, cb) + rb)
+    return center, int(math.ceil(rad - 1e-9))
+
+
+def compact_spheres(spheres, tolerance=0):
+    """
+    한 라벨의 구 목록을 압축해 새 목록으로 반환.
+    1) 완전 중복 제거
+    2) tolerance > 0: 가장 가까운 구끼리 감싸는 구로 병합
+       (새로 덮이는 RGB 격자점 수의 합계가 tolerance 이하일 때만)
+    3) 나머지 구들의 합집합에 완전히 포함되는 구 제거
+    - RGB 격자(0~255)에서 덮는 영역은 tolerance=0이면 그대로 유지됨
+    """
+    # 1) 완전 중복 제거 (먼저 나온 것 유지)
+    seen = set()
+    alive = []
+    for center, radius in spheres:
+        sp = (_to_rgb_tuple(center), abs(int(radius)))
+        if sp not in seen:
+            seen.add(sp)
+            alive.append(sp)
+    if len(alive) < 2:
+        return alive
+
+    # 격자점별로 몇 개의 구가 덮고 있는지 카운트
+    cov = np.zeros((LUT_SIDE, LUT_SIDE, LUT_SIDE), dtype=np.uint16)
+    for sp in alive:
+        _coverage_update(cov, sp, +1)
+
+    # 2) 허용 오차 내 탐욕적 병합
+    budget = int(tolerance)
+    i = 0
+    while budget > 0 and i < len(alive) and len(alive) > 1:
+        centers = np.array([c for c, _ in alive], dtype=float)
+        dist = np.linalg.norm(centers - centers[i], axis=1)
+        dist[i] = np.inf
+        j = int(np.argmin(dist))
+        merged = _enclosing_sphere(alive[i], alive[j])
+        clipped = clip_sphere(*merged)
+        extra = 0 if clipped is None else int(np.count_nonzero(cov[clipped[0]][clipped[1]] == 0))
+        if extra <= budget:
+            budget -= extra
+            _coverage_update(cov, merged, +1)
+            _coverage_update(cov, alive[i], -1)
+            _coverage_update(cov, alive[j], -1)
+            alive[i] = merged
+            del alive[j]
+            if j < i:
+                i -= 1
+        else:
+            i += 1
+
+    # 3) 다른 구들의 합집합에 포함되는 구 제거 (나중에 추가된 것부터)
+    kept = []
+    for sp in reversed(alive):
+        clipped = clip_sphere(*sp)
+        if clipped is None:
+            continue  # RGB 공간 밖 → 덮는 색이 없음
+        dst, ball = clipped
+        if cov[dst][ball].min() >= 2:
+            _coverage_update(cov, sp, -1)
+        else:
+            kept.append(sp)
+    kept.reverse()
+    return kept
+
+
+def compact_defs(defs=None, tolerance=0):
+    """
+    모든 라벨의 구 목록을 compact_spheres로 in-place 압축.
+    - (압축 전 개수, 압축 후 개수) 반환
+    """
+    target = COLOR_DEFS if defs is None else defs
+    if target is not COLOR_DEFS:
+        return _compact_defs(target, tolerance)
+    with _DEFS_LOCK:
+        before, after = _compact_defs(target, tolerance)
+        if after != before:
+            # tolerance=0 이면 라벨별 커버 영역이 같으므로 컴파일된 LUT는 그대로 유효
+            _touch_defs(added=[] if not tolerance else None)
+    return before, after
+
+
+def _compact_defs(target, tolerance):
+    before = sum(len(v) for v in target.values())
+    for label in list(target.keys()):
+        target[label] = compact_spheres(target[label], tolerance)
+    after = sum(len(v) for v in target.values())
+    return before, after
 
 
 # =========================
 # JSON 저장/로드/초기화
 # =========================
-def save_defs(filepath=SAVE_FILE):
-    """현재 COLOR_DEFS를 JSON 파일로 저장"""
-    serializable = {
-        k: [[list(_to_rgb_tuple(center)), int(radius)] for center, radius in v]
-        for k, v in COLOR_DEFS.items()
-    }
-    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(serializable, f, indent=2, ensure_ascii=False)
+def _parse_defs(data):
+    """JSON 객체 → {label: [((r,g,b), radius), ...]} (기본 라벨 포함, 타입 정규화)"""
+    loaded = {k: [] for k in ("background", "product", "defect")}
+    for k, v in data.items():
+        loaded[k] = [(_to_rgb_tuple(center), int(radius)) for center, radius in v]
+    return loaded
+
+
+def _write_json(filepath, obj):
+    """임시 파일 → os.replace (다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록)"""
+    path = Path(filepath)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def save_defs(filepath=SAVE_FILE, compact=True):
+    """
+    현재 COLOR_DEFS를 JSON 파일로 저장.
+    - compact=True: 저장 전 중복/포함 구 압축 (tolerance=0 → 덮는 색 영역과 컴파일된 LUT는 그대로)
+    """
+    if compact:
+        before, after = compact_defs()
+        print(f"색상 구 압축: {before} → {after}개 ({before - after}개 제거)")
+
+    with _DEFS_LOCK:
+        serializable = {
+            k: [[list(_to_rgb_tuple(center)), int(radius)] for center, radius in v]
+            for k, v in COLOR_DEFS.items()
+        }
+        version = _DEFS_VERSION
+    _write_json(filepath, serializable)
     print(f"색상 정의 저장됨 → {filepath}")
 
+    # 저장된 내용 그대로 컴파일 LUT 사이드카 갱신 (다음 시작 시 memmap 재사용)
+    key = _defs_key(Path(filepath).read_bytes())
+    lut_version, lut = lut_snapshot()
+    if lut_version == version:
+        lut.save(_lut_path(filepath), key)
+
 
 def load_defs(filepath=SAVE_FILE):
     """JSON 파일에서 COLOR_DEFS 불러오기 (타입 정규화 포함)"""
@@ -114,37 +387,75 @@ def load_defs(filepath=SAVE_FILE):
         print("⚠️ 저장된 색상 정의 파일 없음")
         return
     try:
-        text = Path(filepath).read_text(encoding="utf-8").strip()
+        raw = Path(filepath).read_bytes()
+        text = raw.decode("utf-8").strip()
         if not text:
             print("⚠️ 색상 정의 파일이 비어 있음")
             return
-        data = json.loads(text)
+        loaded = _parse_defs(json.loads(text))
 
         # in-place 업데이트 (전역 객체 참조 유지)
-        COLOR_DEFS.clear()
-        for k in ("background", "product", "defect"):
-            COLOR_DEFS[k] = []
-
-        for k, v in data.items():
-            fixed_list = []
-            for center, radius in v:
-                fixed_list.append((_to_rgb_tuple(center), int(radius)))
-            COLOR_DEFS[k] = fixed_list
+        with _DEFS_LOCK:
+            COLOR_DEFS.clear()
+            COLOR_DEFS.update(loaded)
+            _touch_defs()
+            _attach_lut(filepath, raw)
 
         print(f"색상 정의 불러옴 ← {filepath}")
     except json.JSONDecodeError as e:
         print(f"⚠️ JSON 파싱 실패: {e}")
 
 
+def load_lut(filepath=SAVE_FILE):
+    """
+    파일의 정의만으로 만든 ColorLUT (전역 COLOR_DEFS/LUT 캐시는 건드리지 않음).
+    - 사이드카 LUT가 파일 내용과 일치하면 memmap 재사용
+    - 파일이 없거나 비었거나 깨졌으면 None (쓰는 도중일 수 있으므로 호출 측이 나중에 재시도)
+    """
+    try:
+        raw = Path(filepath).read_bytes()
+        defs = _parse_defs(json.loads(raw.decode("utf-8")))
+    except (OSError, ValueError, TypeError) as e:
+        print(f"⚠️ 색상 정의 읽기 실패: {e}")
+        return None
+    return _open_or_compile(filepath, raw, defs)
+
+
 def clear_defs(filepath=SAVE_FILE):
     """JSON 파일과 메모리의 COLOR_DEFS를 초기화"""
-    COLOR_DEFS.clear()
-    COLOR_DEFS.update({
-        "background": [],
-        "product": [],
-        "defect": [],
-    })
-    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(COLOR_DEFS, f, indent=2, ensure_ascii=False)
+    with _DEFS_LOCK:
+        COLOR_DEFS.clear()
+        COLOR_DEFS.update({
+            "background": [],
+            "product": [],
+            "defect": [],
+        })
+        _touch_defs(cleared=True)
+    _write_json(filepath, {"background": [], "product": [], "defect": []})
     print(f"🚮 색상 정의 초기화 완료 → {filepath}")
+
+
+# =========================
+# CLI (구 집합 압축)
+# =========================
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="색상 정의 파일의 중복/포함 구 압축")
+    ap.add_argument("path", nargs="?", default=str(SAVE_FILE), help="색상 정의 JSON 경로")
+    ap.add_argument("--compact", action="store_true", help="압축 후 같은 파일에 저장")
+    ap.add_argument("--tolerance", type=int, default=0,
+                    help="병합 허용 오차 (새로 덮이는 RGB 격자점 수, 0 = 덮는 영역 유지)")
+    args = ap.parse_args(argv)
+
+    load_defs(args.path)
+    before, after = compact_defs(tolerance=args.tolerance)
+    print(f"색상 구 압축: {before} → {after}개 ({before - after}개 제거)")
+    if args.compact:
+        save_defs(args.path, compact=False)
+    else:
+        print("(미리보기: --compact 를 주면 저장)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+# package/frame_cache.py
+"""
+UI 탐색용 프레임 캐시.
+
+- FrameCache: 디코딩된 프레임과 라벨맵을 바이트 한도 LRU로 보관
+  (라벨맵은 정의 버전(color_utils.defs_version)별로 보관 → 정의가 바뀌면 자동 무효)
+- Prefetcher: 백그라운드 스레드가 다음에 볼 프레임들을 미리 읽고 분류해 캐시에 채움
+  (새 요청이 오면 이전 요청의 남은 작업은 버림, 요청마다 LUT 스냅숏/로더를 묶어 전달)
+"""
+import threading
+from collections import OrderedDict
+
+from package.color_utils import defs_version, lut_snapshot
+from package.frame_io import read_frame
+from package.image_utils import make_label_map
+from package.operation import FRAME_CACHE_BYTES
+
+
+class FrameCache:
+    """("img", 경로) / ("labels", 경로, 정의 버전) → 배열, 총 바이트 기준 LRU (스레드 안전)"""
+
+    def __init__(self, max_bytes=FRAME_CACHE_BYTES):
+        self.max_bytes = int(max_bytes)
+        self.nbytes = 0
+        self.epoch = 0                  # clear()마다 증가 → 그 전에 시작한 미리 읽기 결과는 버림
+        self._items = OrderedDict()     # key → 배열
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def _put(self, key, value, epoch=None):
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._items[key] = value
+            self.nbytes += value.nbytes
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, victim = self._items.popitem(last=False)
+                self.nbytes -= victim.nbytes
+
+    # -------------------------
+    def get_frame(self, path):
+        return self._get(("img", path))
+
+    def put_frame(self, path, img, epoch=None):
+        self._put(("img", path), img, epoch)
+
+    def get_labels(self, path, version=None):
+        return self._get(("labels", path, defs_version() if version is None else version))
+
+    def put_labels(self, path, version, label_map, epoch=None):
+        if version == defs_version():   # 계산 도중 정의가 바뀌었으면 보관하지 않음
+            self._put(("labels", path, version), label_map, epoch)
+
+    # -------------------------
+    def drop_stale_labels(self):
+        """현재 정의 버전이 아닌 라벨맵 제거 (정의 변경 후 메모리 회수)"""
+        version = defs_version()
+        with self._lock:
+            for key in [k for k in self._items if k[0] == "labels" and k[2] != version]:
+                self.nbytes -= self._items.pop(key).nbytes
+
+    def discard(self, path):
+        with self._lock:
+            for key in [k for k in self._items if k[1] == path]:
+                self.nbytes -= self._items.pop(key).nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+            self.epoch += 1
+
+
+class Prefetcher:
+    """
+    request(paths, loader, snapshot): paths를 순서대로 읽고(loader) 분류해 cache에 채움.
+    이미 캐시에 있으면 건너뛰고, 새 request가 오면 남은 이전 목록은 버림 (최신 요청 우선).
+    - 분류는 요청 시점의 (정의 버전, LUT) 스냅숏으로 → 버전과 라벨맵이 항상 일치
+    - loader는 요청한 스레드의 상태(링 핸들 등)를 묶어서 넘김 (워커가 그 상태를 직접 읽지 않도록)
+    """
+
+    def __init__(self, cache, loader=read_frame):
+        self.cache = cache
+        self.loader = loader            # 경로 → BGR 배열 (None = 실패), 요청별 loader가 없을 때
+        self._pending = []              # [(경로, loader, 정의 버전, LUT)]
+        self._busy = False              # 워커가 항목 하나를 처리 중
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+        self._thread.start()
+
+    def request(self, paths, loader=None, snapshot=None):
+        """snapshot: (정의 버전, LUT) (None = 지금 lut_snapshot())"""
+        version, lut = snapshot or lut_snapshot()
+        loader = loader or self.loader
+        with self._cond:
+            self._pending = [(path, loader, version, lut) for path in paths]
+            self._cond.notify_all()
+
+    def cancel(self, wait=False):
+        """남은 요청 버림. wait=True: 처리 중인 항목이 끝날 때까지 대기 (로더가 쓰는 링을 닫기 전 등)"""
+        with self._cond:
+            self._pending = []
+            while wait and self._busy:
+                self._cond.wait()
+
+    def _next(self):
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            self._busy = True
+            return self._pending.pop(0)
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            try:
+                self._fill(*item)
+            except Exception as e:
+                print(f"⚠️ 미리 읽기 실패: {item[0]} ({e})")
+
+    def _fill(self, path, loader, version, lut):
+        epoch = self.cache.epoch
+        img = self.cache.get_frame(path)
+        if img is None:
+            img = loader(path)
+            if img is None:
+                return
+            self.cache.put_frame(path, img, epoch)
+        if self.cache.get_labels(path, version) is None:
+            self.cache.put_labels(path, version, make_label_map(img, lut), epoch)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending = []
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
@@ -0,0 +1,168 @@
+# package/frame_events.py
+"""
+캡처 프로세스 ↔ UI 간 로컬 이벤트 채널 (multiprocessing.connection, 127.0.0.1).
+
+- UI(main.py)가 EventServer를 열고 주소/인증키를 환경변수로 캡처 서브프로세스에 전달
+- 캡처 → UI: {"type": "reset"} (폴더 초기화됨), {"type": "ring", "name": ...} (공유 메모리 링),
+             {"type": "frame", "path": ..., "seq": ..., "saved": bool,
+              "frame_id": ..., "camera_timestamp": ..., "time": ...},
+             {"type": "batch_done", "count": n},
+             {"type": "evict", "paths": [...]} (스트리밍 롤링 윈도에서 삭제),
+             {"type": "verdict", "path": ..., "verdict": "OK"/"NG", ...} (스트리밍 인라인 분류)
+- UI → 캡처: {"type": "capture"} (폴더를 비웠으니 새 배치 촬영 요청)
+폴더 스캔 없이 새 프레임이 바로 UI에 전달된다.
+"""
+import os
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+
+EVENT_ADDRESS_ENV = "VISION_SORTER_EVENTS"
+EVENT_AUTHKEY_ENV = "VISION_SORTER_EVENTS_KEY"
+
+
+# =========================
+# 이벤트 생성 헬퍼
+# =========================
+def reset_event():
+    return {"type": "reset", "time": time.time()}
+
+
+def ring_event(name):
+    return {"type": "ring", "name": name, "time": time.time()}
+
+
+def frame_event(path, seq=None, saved=True, frame=None):
+    """
+    seq가 있으면 공유 메모리 링에서 바로 읽을 수 있는 프레임.
+    saved=False: 파일로 저장하지 않는 링 전용 프레임 (슬롯이 덮어쓰이면 사라짐)
+    frame: 소스의 Frame → 카메라 프레임 번호/타임스탬프 전달 (UI에서 카메라 번호와 대조)
+    """
+    event = {"type": "frame", "path": str(path), "seq": seq, "saved": bool(saved), "time": time.time()}
+    if frame is not None:
+        event["frame_id"] = int(frame.frame_id)
+        event["camera_timestamp"] = int(frame.camera_timestamp)
+    return event
+
+
+def batch_done_event(count):
+    return {"type": "batch_done", "count": int(count), "time": time.time()}
+
+
+def evict_event(paths):
+    return {"type": "evict", "paths": [str(p) for p in paths], "time": time.time()}
+
+
+def verdict_event(path, verdict, stats):
+    return {
+        "type": "verdict", "path": str(path), "verdict": verdict,
+        "defect_ratio": stats.defect_ratio, "defect_blobs": stats.defect_blobs,
+        "time": time.time(),
+    }
+
+
+def capture_request_event():
+    return {"type": "capture", "time": time.time()}
+
+
+# =========================
+# 채널
+# =========================
+class EventChannel:
+    """Connection 래퍼: 여러 스레드에서 send 해도 안전"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, event):
+        """이벤트 전송. 상대가 끊겼으면 False"""
+        try:
+            with self._lock:
+                self._conn.send(event)
+            return True
+        except (OSError, EOFError, ValueError):
+            return False
+
+    def recv(self, timeout=None):
+        """이벤트 수신 (timeout 초 안에 없으면 None). 연결이 끊기면 EOFError"""
+        if timeout is not None and not self._conn.poll(timeout):
+            return None
+        return self._conn.recv()
+
+    def close(self):
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+
+
+class EventServer:
+    """
+    UI 측 서버. 백그라운드 스레드가 캡처 프로세스 접속을 받아
+    수신 이벤트마다 on_event(event)를 호출한다 (호출 스레드 = 수신 스레드).
+    """
+
+    def __init__(self, on_event=None):
+        self._authkey = os.urandom(16)
+        self._listener = Listener(("127.0.0.1", 0), authkey=self._authkey)
+        self.on_event = on_event
+        self._channel = None
+        self._closed = False
+        threading.Thread(target=self._serve, name="frame-events", daemon=True).start()
+
+    def env(self):
+        """캡처 서브프로세스에 넘길 환경변수"""
+        host, port = self._listener.address
+        return {
+            EVENT_ADDRESS_ENV: f"{host}:{port}",
+            EVENT_AUTHKEY_ENV: self._authkey.hex(),
+        }
+
+    def _serve(self):
+        # 캡처 프로세스가 재시작돼도 다시 접속을 받음
+        while not self._closed:
+            try:
+                channel = EventChannel(self._listener.accept())
+            except OSError:
+                return
+            self._channel = channel
+            try:
+                while True:
+                    event = channel.recv()
+                    if self.on_event is not None:
+                        self.on_event(event)
+            except (EOFError, OSError):
+                pass
+            finally:
+                self._channel = None
+                channel.close()
+
+    def send(self, event):
+        """캡처 프로세스로 전송 (접속 전이면 False)"""
+        channel = self._channel
+        return channel is not None and channel.send(event)
+
+    @property
+    def connected(self):
+        return self._channel is not None
+
+    def close(self):
+        self._closed = True
+        if self._channel is not None:
+            self._channel.close()
+        self._listener.close()
+
+
+def connect_from_env():
+    """캡처 측: 환경변수에 채널 정보가 있으면 접속한 EventChannel, 없으면 None"""
+    address = os.environ.get(EVENT_ADDRESS_ENV)
+    authkey = os.environ.get(EVENT_AUTHKEY_ENV)
+    if not address or not authkey:
+        return None
+    host, port = address.rsplit(":", 1)
+    try:
+        return EventChannel(Client((host, int(port)), authkey=bytes.fromhex(authkey)))
+    except OSError as e:
+        print(f"⚠️ 이벤트 채널 접속 실패: {e}")
+        return None
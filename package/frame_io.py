@@ -0,0 +1,174 @@
+# package/frame_io.py
+"""
+프레임 저장 포맷 (캡처 ↔ UI/배치 도구 공용).
+
+- "jpeg": 작고 범용적이지만 손실 압축 → 색 분류에 압축 잡음이 섞이고 인코딩 CPU 비용
+- "png" : 무손실, PNG_COMPRESSION(0~9)로 속도/크기 조절
+- "npy" : 무압축 원본 배열. 쓰기 가장 빠르고 읽을 때 디코딩 없음 (mmap 가능)
+
+캡처 폴더에는 META_NAME(capture.json)에 포맷을 기록하고,
+읽는 쪽은 frame_files()/read_frame()으로 포맷에 맞게 불러온다.
+폴더 비우기는 reset_dir(): 이름 바꾸기로 즉시 비우고 실제 삭제는 백그라운드.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from package.operation import STORAGE_FORMAT, JPEG_QUALITY, PNG_COMPRESSION
+
+FORMAT_EXT = {"jpeg": ".jpg", "png": ".png", "npy": ".npy"}
+META_NAME = "capture.json"
+
+
+def frame_ext(fmt=STORAGE_FORMAT):
+    try:
+        return FORMAT_EXT[fmt]
+    except KeyError:
+        raise ValueError(f"알 수 없는 저장 포맷: {fmt} (가능: {', '.join(FORMAT_EXT)})")
+
+
+# =========================
+# 쓰기
+# =========================
+def encoder_params(fmt=STORAGE_FORMAT, jpeg_quality=JPEG_QUALITY, png_compression=PNG_COMPRESSION):
+    if fmt == "jpeg":
+        return [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+    if fmt == "png":
+        return [int(cv2.IMWRITE_PNG_COMPRESSION), int(png_compression)]
+    return []
+
+
+def encode_frame(img, fmt=STORAGE_FORMAT, params=None):
+    """img → 기록할 데이터 (jpeg/png: 인코딩된 바이트 배열, npy: 원본 배열 그대로)"""
+    if fmt == "npy":
+        return np.ascontiguousarray(img)
+    if params is None:
+        params = encoder_params(fmt)
+    ok, buf = cv2.imencode(frame_ext(fmt), img, params)    # GIL 해제
+    if not ok:
+        raise RuntimeError(f"{fmt} 인코딩 실패")
+    return buf
+
+
+def write_encoded(path, data, fmt=STORAGE_FORMAT):
+    """encode_frame() 결과를 path에 기록"""
+    if fmt == "npy":
+        with open(path, "wb") as f:
+            np.save(f, data, allow_pickle=False)
+    else:
+        data.tofile(str(path))
+
+
+def write_frame(path, img, fmt=STORAGE_FORMAT, params=None):
+    """img를 fmt로 path에 기록"""
+    write_encoded(path, encode_frame(img, fmt, params), fmt)
+
+
+def write_meta(directory, fmt=STORAGE_FORMAT, **extra):
+    """캡처 폴더에 저장 포맷 기록"""
+    meta = {"format": fmt, "ext": frame_ext(fmt), "created": time.time(), **extra}
+    (Path(directory) / META_NAME).write_text(json.dumps(meta, ensure_ascii=False, indent=2),
+                                            encoding="utf-8")
+
+
+# =========================
+# 읽기
+# =========================
+def read_meta(directory):
+    """capture.json → dict (없거나 깨졌으면 None)"""
+    try:
+        return json.loads((Path(directory) / META_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def frame_files(directory):
+    """폴더의 프레임 파일 목록 (메타가 없으면 jpg = 이전 캡처 폴더)"""
+    meta = read_meta(directory)
+    ext = meta.get("ext", ".jpg") if meta else ".jpg"
+    return sorted(Path(directory).glob(f"frame_*{ext}"))
+
+
+def read_frame(path, mmap=False):
+    """
+    프레임 파일 → BGR uint8 배열 (실패 시 None). 포맷은 확장자로 판단.
+    - mmap=True: .npy를 읽기 전용 memmap으로 (복사 없음, 파일이 열린 채로 유지됨)
+    """
+    path = Path(path)
+    try:
+        if path.suffix.lower() == ".npy":
+            return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        return cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+    except (OSError, ValueError, EOFError):
+        return None
+
+
+# =========================
+# 폴더 초기화
+# =========================
+def _trash_glob(path):
+    return f".{path.name}.trash-*"
+
+
+def _remove_all(victims):
+    for v in victims:
+        try:
+            if v.is_dir():
+                shutil.rmtree(v, ignore_errors=True)
+            else:
+                v.unlink()
+        except OSError:
+            pass
+
+
+def _move_files(src, trash, keep):
+    """src의 항목(keep 제외)을 trash 폴더로 옮김. 옮길 수 없으면 그 자리에서 바로 삭제"""
+    trash.mkdir(parents=True, exist_ok=True)
+    for p in list(src.iterdir()):
+        if p.name in keep:
+            continue
+        try:
+            os.replace(p, trash / p.name)
+        except OSError:
+            _remove_all([p])
+
+
+def reset_dir(path, keep=()):
+    """
+    path를 즉시 빈 폴더로 만들고 이전 내용은 백그라운드 스레드에서 삭제 → 삭제 스레드.
+    - 폴더를 같은 위치의 숨김 폴더(.<이름>.trash-*)로 이름만 바꾼 뒤 새로 만듦 (파일 수와 무관하게 즉시)
+    - keep: 새 폴더로 다시 옮겨올 파일 이름 (예: capture.json)
+    - 이름 바꾸기가 안 되면 (Windows에서 파일이 열려 있는 경우 등) 파일을 하나씩 휴지통 폴더로 옮긴 뒤
+      백그라운드 삭제 (옮기기까지는 동기 → 곧바로 같은 이름으로 쓰이는 새 프레임은 지워지지 않음)
+    - 이전 실행이 지우다 만 휴지통 폴더도 함께 정리
+    """
+    path = Path(path)
+    victims = [p for p in path.parent.glob(_trash_glob(path)) if p.is_dir()]
+    trash = None
+    if path.exists():
+        trash = path.with_name(f".{path.name}.trash-{os.getpid()}-{time.time_ns()}")
+        try:
+            os.replace(path, trash)
+            victims.append(trash)
+        except OSError as e:
+            print(f"⚠️ 폴더 이름 변경 실패 → 파일 단위로 옮겨 삭제: {e}")
+            _move_files(path, trash, keep)
+            victims.append(trash)
+            trash = None
+    path.mkdir(parents=True, exist_ok=True)
+    if trash is not None:
+        for name in keep:
+            try:
+                os.replace(trash / name, path / name)
+            except OSError:
+                pass
+
+    worker = threading.Thread(target=_remove_all, args=(victims,), name="dir-cleanup", daemon=True)
+    worker.start()
+    return worker
@@ -0,0 +1,144 @@
+# package/frame_ring.py
+"""
+프로세스 간 공유 메모리 프레임 링 버퍼 (multiprocessing.shared_memory).
+
+레이아웃: [슬롯 헤더 × N][슬롯 데이터 × N]
+- 슬롯 헤더: seq(int64), h, w, c(int32), timestamp(float64), frame_id, camera_timestamp(int64)
+- seq 번째 프레임은 seq % N 슬롯에 기록 (오래된 프레임부터 덮어씀)
+- 쓰기 중에는 헤더 seq = -1 → 읽는 쪽은 읽기 전후 seq를 비교해 덮어쓰기 여부 확인
+
+캡처 프로세스가 create()로 만들고, UI/분류기는 attach()로 붙어 JPEG 없이 프레임을 읽는다.
+"""
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+HEADER_DTYPE = np.dtype([
+    ("seq", np.int64),
+    ("h", np.int32),
+    ("w", np.int32),
+    ("c", np.int32),
+    ("pad", np.int32),
+    ("timestamp", np.float64),
+    ("frame_id", np.int64),             # 카메라 프레임 번호 (-1 = 없음)
+    ("camera_timestamp", np.int64),     # 카메라 타임스탬프 tick (0 = 없음)
+])
+# 링 전체 메타: 슬롯 수, 슬롯 바이트, 마지막으로 완료된 seq
+META_DTYPE = np.dtype([
+    ("slots", np.int64),
+    ("slot_bytes", np.int64),
+    ("latest", np.int64),
+    ("pad", np.int64),
+])
+
+
+def _attach_shm(name):
+    """기존 공유 메모리에 접속 (소유자가 아니므로 종료 시 unlink 하지 않도록)"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            # POSIX resource_tracker가 접속한 쪽에서도 unlink 하는 문제 회피
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class FrameRing:
+    """고정 크기 BGR 슬롯 N개짜리 공유 메모리 링 버퍼"""
+
+    def __init__(self, shm, owner):
+        self._shm = shm
+        self._owner = owner
+        self.name = shm.name
+        self.meta = np.ndarray((1,), dtype=META_DTYPE, buffer=shm.buf)
+        self.slots = int(self.meta["slots"][0])
+        self.slot_bytes = int(self.meta["slot_bytes"][0])
+        self.headers = np.ndarray((self.slots,), dtype=HEADER_DTYPE, buffer=shm.buf,
+                                  offset=META_DTYPE.itemsize)
+        data_offset = META_DTYPE.itemsize + HEADER_DTYPE.itemsize * self.slots
+        self.data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=shm.buf,
+                               offset=data_offset)
+        self._next_seq = int(self.meta["latest"][0]) + 1
+
+    # -------------------------
+    @classmethod
+    def create(cls, slots, slot_bytes, name=None):
+        """새 링 생성 (쓰는 쪽)"""
+        size = META_DTYPE.itemsize + (HEADER_DTYPE.itemsize + slot_bytes) * slots
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        meta = np.ndarray((1,), dtype=META_DTYPE, buffer=shm.buf)
+        meta[0] = (slots, slot_bytes, -1, 0)
+        headers = np.ndarray((slots,), dtype=HEADER_DTYPE, buffer=shm.buf, offset=META_DTYPE.itemsize)
+        headers["seq"] = -1
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """기존 링에 접속 (읽는 쪽)"""
+        return cls(_attach_shm(name), owner=False)
+
+    # -------------------------
+    def write(self, img, timestamp=None, frame_id=-1, camera_timestamp=0):
+        """프레임 기록 → seq (슬롯보다 크면 None). timestamp/frame_id는 소스(Frame) 값 그대로"""
+        img = np.ascontiguousarray(img)
+        if img.nbytes > self.slot_bytes:
+            return None
+        seq = self._next_seq
+        self._next_seq += 1
+        slot = seq % self.slots
+        hdr = self.headers[slot:slot + 1]
+
+        hdr["seq"] = -1     # 쓰기 중 표시
+        self.data[slot, :img.nbytes] = img.reshape(-1).view(np.uint8)
+        h, w = img.shape[:2]
+        c = img.shape[2] if img.ndim == 3 else 1
+        hdr["h"], hdr["w"], hdr["c"] = h, w, c
+        hdr["timestamp"] = time.time() if timestamp is None else timestamp
+        hdr["frame_id"] = frame_id
+        hdr["camera_timestamp"] = camera_timestamp
+        hdr["seq"] = seq    # 완료
+        self.meta["latest"] = seq
+        return seq
+
+    def latest_seq(self):
+        """마지막으로 완료된 seq (-1 = 없음)"""
+        return int(self.meta["latest"][0])
+
+    def is_valid(self, seq):
+        """seq 프레임이 아직 덮어쓰이지 않았는지"""
+        return seq >= 0 and int(self.headers["seq"][seq % self.slots]) == seq
+
+    def read(self, seq, copy=True):
+        """
+        seq 프레임 → (img, timestamp), 이미 덮어쓰였으면 None.
+        - copy=False: 공유 메모리 뷰 (복사 없음). 사용 후 is_valid(seq)로 유효성 재확인 필요
+        """
+        slot = seq % self.slots
+        hdr = self.headers[slot].copy()
+        if int(hdr["seq"]) != seq:
+            return None
+        h, w, c = int(hdr["h"]), int(hdr["w"]), int(hdr["c"])
+        shape = (h, w, c) if c > 1 else (h, w)
+        view = self.data[slot, :h * w * c].reshape(shape)
+        img = view.copy() if copy else view
+        if copy and not self.is_valid(seq):
+            return None     # 복사 도중 덮어쓰임
+        return img, float(hdr["timestamp"])
+
+    # -------------------------
+    def close(self):
+        # numpy 뷰가 버퍼를 잡고 있으면 close가 실패하므로 먼저 해제
+        self.meta = self.headers = self.data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,153 @@
+# package/frame_writer.py
+import collections
+import queue
+import threading
+import time
+
+from package.operation import (
+    STORAGE_FORMAT, JPEG_QUALITY, ENCODER_THREADS, WRITE_QUEUE_SIZE, WRITE_QUEUE_TIMEOUT,
+)
+from package.frame_io import encoder_params, encode_frame, write_encoded
+
+
+class FrameWriter:
+    """
+    캡처 루프와 인코딩/파일 쓰기를 분리하는 생산자-소비자 파이프라인.
+    - submit(): 프레임을 유한 큐에 넣고 바로 반환 (큐가 차면 최대 put_timeout 대기 = 백프레셔)
+    - 대기 후에도 자리가 없으면 프레임을 버리고 dropped 카운터 증가
+    - 워커 스레드들이 fmt(jpeg/png/npy)로 인코딩(GIL 해제) + 파일 기록 수행
+    - on_written(path): 파일 기록 완료 시 워커 스레드에서 호출 (이벤트 통지용)
+    - on_frame(path, img): 저장 후 워커 스레드에서 호출 (인라인 분류 등)
+    - save=False: 인코딩/저장 없이 on_frame만 실행
+    - stats(CaptureStats): queue(대기) / encode / write 단계 시간과 written 처리량 기록
+    """
+
+    def __init__(self, threads=ENCODER_THREADS, queue_size=WRITE_QUEUE_SIZE,
+                 put_timeout=WRITE_QUEUE_TIMEOUT, jpeg_quality=JPEG_QUALITY,
+                 on_written=None, on_frame=None, save=True, fmt=STORAGE_FORMAT, stats=None):
+        self.on_written = on_written
+        self.stats = stats
+        self.on_frame = on_frame
+        self.save = save
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._put_timeout = put_timeout
+        self.fmt = fmt
+        self._params = encoder_params(fmt, jpeg_quality=jpeg_quality)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f"frame-writer-{i}", daemon=True)
+            for i in range(max(1, int(threads)))
+        ]
+        for t in self._threads:
+            t.start()
+
+    # -------------------------
+    def submit(self, path, img):
+        """프레임 저장 요청. 큐에 들어가면 True, 버려지면 False"""
+        try:
+            self._queue.put((path, img, time.perf_counter()), timeout=self._put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            if self.stats is not None:
+                self.stats.tick("dropped")
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, img, t_submit = item
+                stats = self.stats
+                t0 = time.perf_counter()
+                if stats is not None:
+                    stats.record("queue", t0 - t_submit)
+                if self.save:
+                    data = encode_frame(img, self.fmt, self._params)
+                    t1 = time.perf_counter()
+                    write_encoded(path, data, self.fmt)
+                    if stats is not None:
+                        stats.record("encode", t1 - t0)
+                        stats.record("write", time.perf_counter() - t1)
+                        stats.tick("written")
+                    with self._lock:
+                        self.written += 1
+                    print(f"저장됨: {path}")
+                    if self.on_written is not None:
+                        self.on_written(path)
+                if self.on_frame is not None:
+                    self.on_frame(path, img)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"⚠️ 저장 실패: {e}")
+            finally:
+                self._queue.task_done()
+
+    # -------------------------
+    def flush(self):
+        """큐에 쌓인 프레임이 모두 기록될 때까지 대기"""
+        self._queue.join()
+
+    def close(self):
+        """남은 프레임을 모두 기록하고 워커 종료"""
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    def summary(self):
+        with self._lock:
+            return (f"제출 {self.submitted} / 저장 {self.written} / "
+                    f"드롭 {self.dropped} / 오류 {self.errors}")
+
+
+class RollingWindow:
+    """
+    스트리밍 저장용 롤링 윈도: 기록된 파일을 순서대로 추적하고
+    개수(max_files) 또는 총 바이트(max_bytes)를 넘으면 가장 오래된 파일부터 삭제.
+    """
+
+    def __init__(self, max_files=0, max_bytes=0):
+        self.max_files = int(max_files)
+        self.max_bytes = int(max_bytes)
+        self._files = collections.deque()   # (path, size)
+        self.total_bytes = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def add(self, path):
+        """기록 완료된 파일 등록 → 삭제된(밀려난) 경로 목록"""
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = 0
+        victims = []
+        with self._lock:
+            self._files.append((path, size))
+            self.total_bytes += size
+            while len(self._files) > 1 and (
+                (self.max_files and len(self._files) > self.max_files)
+                or (self.max_bytes and self.total_bytes > self.max_bytes)
+            ):
+                old, old_size = self._files.popleft()
+                self.total_bytes -= old_size
+                victims.append(old)
+            self.evicted += len(victims)
+        for old in victims:
+            try:
+                old.unlink()
+            except OSError as e:
+                print(f"⚠️ 오래된 프레임 삭제 실패: {e}")
+        return victims
@@ -1,168 +1,182 @@
 # package/image_utils.py
+from collections import OrderedDict
+from dataclasses import dataclass
 import cv2
 import numpy as np
-from package.color_utils import COLOR_DEFS  # 전역 정의 사용
-from package.operation import PIXEL_MAP_MAX_SIDE  # 다운스케일 최대 크기
+from package.color_utils import get_compiled_lut  # 전역 정의 컴파일 결과 사용
+from package.color_lut import LABEL_NAMES, LABEL_INDEX, pack_rgb24
+from package.pixel_engine import get_engine
+from package.operation import DEFECT_RATIO_THRESHOLD, PIXMAP_CACHE_SIZE
+
+
+def to_qimage(img_bgr, QtGui):
+    """
+    BGR numpy → QImage (Qt 5.14+ Format_BGR888: 색 변환/복사 없이 배열 버퍼를 그대로 감쌈).
+    QImage는 버퍼를 소유하지 않으므로 배열 참조를 QImage에 붙여 함께 유지.
+    """
+    if not img_bgr.flags["C_CONTIGUOUS"]:
+        img_bgr = np.ascontiguousarray(img_bgr)
+    h, w = img_bgr.shape[:2]
+    fmt = getattr(QtGui.QImage, "Format_BGR888", None)
+    if fmt is None:     # 구버전 Qt → RGB 변환 1회
+        img_bgr = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+        fmt = QtGui.QImage.Format_RGB888
+    qimg = QtGui.QImage(img_bgr.data, w, h, img_bgr.strides[0], fmt)
+    qimg._buffer = img_bgr
+    return qimg
 
 
 def to_pixmap(img_bgr, QtGui):
     """BGR numpy → QPixmap"""
-    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-    h, w, ch = img_rgb.shape
-    qimg = QtGui.QImage(img_rgb.data, w, h, ch * w, QtGui.QImage.Format_RGB888)
-    return QtGui.QPixmap.fromImage(qimg)
+    return QtGui.QPixmap.fromImage(to_qimage(img_bgr, QtGui))
+
 
+class PixmapCache:
+    """
+    표시용 QPixmap LRU 캐시. 키 = (프레임 id, 오버레이 버전)
+    → 같은 사진 재표시/오버레이 토글 시 메가픽셀 배열을 다시 변환하지 않음.
+    """
 
-def draw_points(img, points, color=(0, 0, 255), radius=5):
-    """점(드래그 자취) 표시"""
-    overlay = img.copy()
-    for (x, y) in points:
-        cv2.circle(overlay, (x, y), radius, color, -1)
+    def __init__(self, QtGui, size=PIXMAP_CACHE_SIZE):
+        self._QtGui = QtGui
+        self.size = max(1, int(size))
+        self._items = OrderedDict()
+
+    def get(self, key, make_img):
+        """key의 pixmap (없으면 make_img() → BGR 배열로 생성 후 보관)"""
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+            return pixmap
+        pixmap = to_pixmap(make_img(), self._QtGui)
+        self._items[key] = pixmap
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+        return pixmap
+
+    def discard(self, frame_id):
+        """frame_id의 모든 버전 제거"""
+        for key in [k for k in self._items if k[0] == frame_id]:
+            del self._items[key]
+
+    def clear(self):
+        self._items.clear()
+
+
+def rgb_mask(img_bgr, rgb_set):
+    """
+    선택한 RGB 값과 같은 픽셀 → (h,w) bool 마스크.
+    RGB를 24비트 정수로 묶어 2MB 비트셋(2^24 비트)에서 조회 → 이미지 1회 선형 패스.
+    """
+    bits = np.zeros(1 << 21, dtype=np.uint8)
+    if rgb_set:
+        keys = np.array([(int(r) << 16) | (int(g) << 8) | int(b) for r, g, b in rgb_set],
+                        dtype=np.int64)
+        np.bitwise_or.at(bits, keys >> 3, (1 << (keys & 7)).astype(np.uint8))
+
+    packed = pack_rgb24(img_bgr)
+    hit = bits[packed >> 3]
+    packed &= 7
+    hit >>= packed.astype(np.uint8)
+    hit &= 1
+    return hit.view(bool)
+
+
+def highlight_rgb(img_bgr, rgb_set, mask=None):
+    """선택한 RGB 값과 같은 픽셀을 강조(초록). mask: 이미 계산한 rgb_mask (재사용)"""
+    if mask is None:
+        mask = rgb_mask(img_bgr, rgb_set)
+    overlay = img_bgr.copy()
+    overlay[mask] = (0, 255, 0)
     return overlay
 
 
-def highlight_rgb(img_bgr, rgb_set):
-    """선택한 RGB 값과 같은 픽셀을 강조(초록)"""
-    h, w = img_bgr.shape[:2]
-    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+# ======================
+# ⚡ LUT 기반 픽셀 분류
+# ======================
+# 라벨 인덱스(LABEL_NAMES 순서)별 표시 색상
+LABEL_COLORS = np.zeros((len(LABEL_NAMES), 3), dtype=np.uint8)
+LABEL_COLORS[LABEL_INDEX["unknown"]] = (255, 0, 255)
+LABEL_COLORS[LABEL_INDEX["product"]] = (0, 255, 0)
+LABEL_COLORS[LABEL_INDEX["background"]] = (0, 0, 255)
+LABEL_COLORS[LABEL_INDEX["defect"]] = (0, 0, 0)
 
-    mask = np.isin(
-        img_rgb.reshape(-1, 3).view([('', img_rgb.dtype)] * 3),
-        np.array(list(rgb_set)).view([('', np.uint8)] * 3)
-    )
-    mask = mask.reshape(h, w)
 
-    overlay = img_rgb.copy()
-    overlay[mask] = (0, 255, 0)
-    return cv2.cvtColor(overlay, cv2.COLOR_RGB2BGR)
+def make_label_map(img_bgr, lut=None):
+    """
+    컴파일된 256³ 라벨 LUT로 이미지 전체를 원해상도 그대로 분류.
+    - 결과: (h,w) uint8 라벨 인덱스 맵 (LABEL_NAMES 순서, 0 = unknown)
+    - lut: 사용할 ColorLUT (백그라운드 스레드는 lut_snapshot()으로 받은 것을 넘김, None = 현재 정의)
+
+    성능:
+      * 구(Sphere) 집합은 COLOR_DEFS가 바뀔 때만 LUT로 컴파일
+      * 프레임당 비용은 픽셀당 gather 1회 → 구 개수와 무관 (다운스케일 불필요)
+      * 행 밴드 단위로 PixelEngine 스레드 풀에서 병렬 처리
+    """
+    return get_engine().classify(get_compiled_lut() if lut is None else lut, img_bgr)
+
+
+def colorize_label_map(label_map):
+    """라벨 인덱스 맵 → 표시용 (h,w,3) 컬러 이미지 (팔레트 lookup)"""
+    return LABEL_COLORS[label_map]
 
 
-# ======================
-# ⚡ 벡터화된 픽셀 분류 + 다운스케일
-# ======================
 def make_pixel_map(img_bgr):
     """
-    이미지 전체를 타일/배치로 나눠 안전하게 벡터화 분류.
+    make_label_map 결과를 표시용 색으로 칠한 분류맵.
     - unknown: 분홍 (255, 0, 255)
     - product: 초록 (0, 255, 0)
     - background: 파랑 (0, 0, 255)
     - defect: 검정 (0, 0, 0)
+    """
+    return colorize_label_map(make_label_map(img_bgr))
+
 
-    성능 최적화:
-      * 긴 변을 PIXEL_MAP_MAX_SIDE 로 다운스케일 (INTER_AREA)
-      * 분류 계산 후 NEAREST 업스케일로 원해상도 복원
+# ======================
+# 📊 라벨맵 통계
+# ======================
+@dataclass
+class LabelStats:
+    """프레임 한 장의 라벨 통계"""
+    total: int                  # 전체 픽셀 수
+    counts: dict                # {label: 픽셀 수}
+    fractions: dict             # {label: 면적 비율}
+    defect_blobs: int           # 불량 연결 영역 개수 (min_area 이상)
+    defect_areas: np.ndarray    # 불량 연결 영역별 픽셀 수 (큰 순)
+
+    @property
+    def defect_ratio(self):
+        return self.fractions.get("defect", 0.0)
+
+
+def label_stats(label_map, min_area=1):
+    """
+    라벨맵 → LabelStats (컬러 오버레이 없이 라벨맵만으로 계산).
+    - 라벨별 픽셀 수: np.bincount 한 번
+    - 불량 연결 영역: cv2.connectedComponentsWithStats (8-연결)
     """
-    # 타일/배치 파라미터
-    TILE_H, TILE_W = 256, 256
-    SPHERE_CHUNK = 256
+    total = int(label_map.size)
+    bins = np.bincount(label_map.reshape(-1), minlength=len(LABEL_NAMES))
+    counts = {name: int(bins[i]) for i, name in enumerate(LABEL_NAMES)}
+    fractions = {name: (c / total if total else 0.0) for name, c in counts.items()}
+
+    areas = np.zeros(0, dtype=np.int32)
+    if counts["defect"]:
+        mask = (label_map == LABEL_INDEX["defect"]).view(np.uint8)
+        _, _, cc_stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        areas = cc_stats[1:, cv2.CC_STAT_AREA]      # 0번은 배경
+        areas = np.sort(areas[areas >= min_area])[::-1]
+
+    return LabelStats(
+        total=total,
+        counts=counts,
+        fractions=fractions,
+        defect_blobs=int(areas.size),
+        defect_areas=areas,
+    )
 
-    h, w = img_bgr.shape[:2]
-    img_rgb_full = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-
-    # --- (A) 다운스케일 ---
-    scale = 1.0
-    img_rgb = img_rgb_full
-    if PIXEL_MAP_MAX_SIDE and max(h, w) > PIXEL_MAP_MAX_SIDE:
-        scale = PIXEL_MAP_MAX_SIDE / float(max(h, w))
-        new_w = max(1, int(w * scale))
-        new_h = max(1, int(h * scale))
-        img_rgb = cv2.resize(img_rgb_full, (new_w, new_h), interpolation=cv2.INTER_AREA)
-
-    img_rgb = img_rgb.astype(np.int16)
-    hh, ww = img_rgb.shape[:2]
-
-    # 결과 초기화: 분홍(unknown)
-    result = np.full((hh, ww, 3), (255, 0, 255), dtype=np.uint8)
-    assigned = np.zeros((hh, ww), dtype=bool)
-
-    # 라벨 색상 및 우선순위
-    label_colors = {
-        "product":    np.array([0, 255, 0], dtype=np.uint8),
-        "background": np.array([0, 0, 255], dtype=np.uint8),
-        "defect":     np.array([0, 0, 0], dtype=np.uint8),
-    }
-    # 우선순위: product > defect > background
-    label_order = ["product", "defect", "background"]
-
-    # 라벨별 스피어 준비
-    prepped = {}
-    for label in label_order:
-        spheres = COLOR_DEFS.get(label, [])
-        if not spheres:
-            continue
-        centers = np.array([c for (c, r) in spheres], dtype=np.int16)     # (M,3)
-        radii2  = (np.array([r for (c, r) in spheres], dtype=np.int32) ** 2)  # (M,)
-        prepped[label] = (centers, radii2)
-
-    # 스피어가 전혀 없으면 바로 리턴
-    if not prepped:
-        if scale != 1.0:
-            return cv2.resize(result, (w, h), interpolation=cv2.INTER_NEAREST)
-        return result
-
-    # --- 타일 단위 처리 ---
-    for y0 in range(0, hh, TILE_H):
-        y1 = min(y0 + TILE_H, hh)
-        for x0 in range(0, ww, TILE_W):
-            x1 = min(x0 + TILE_W, ww)
-
-            remain_mask_tile = ~assigned[y0:y1, x0:x1]
-            if not np.any(remain_mask_tile):
-                continue
-
-            tile = img_rgb[y0:y1, x0:x1]
-            flat_tile = tile.reshape(-1, 3)
-            flat_remain = remain_mask_tile.reshape(-1)
-            idx_map = np.nonzero(flat_remain)[0]
-            if idx_map.size == 0:
-                continue
-
-            P = flat_tile[idx_map]     # (Kr, 3)
-            Kr = P.shape[0]
-
-            tile_assign = np.zeros(Kr, dtype=bool)
-            tile_color  = np.full((Kr, 3), (255, 0, 255), dtype=np.uint8)
-
-            for label in label_order:
-                if label not in prepped:
-                    continue
-                centers, radii2 = prepped[label]
-                if centers.shape[0] == 0:
-                    continue
-
-                hit_any = np.zeros(Kr, dtype=bool)
-
-                # 스피어를 배치로 쪼개서 계산 (메모리 절약)
-                for s0 in range(0, centers.shape[0], SPHERE_CHUNK):
-                    s1 = min(s0 + SPHERE_CHUNK, centers.shape[0])
-                    C = centers[s0:s1]              # (Mc,3)
-                    R2 = radii2[s0:s1]              # (Mc,)
-
-                    # (Kr,3) - (Mc,3) → (Kr,Mc,3)
-                    diffs = P[:, None, :] - C[None, :, :]
-                    # 제곱거리: Σ (P-C)^2
-                    dist2 = np.einsum('ijk,ijk->ij', diffs, diffs, dtype=np.int32)
-                    hit_any |= np.any(dist2 <= R2[None, :], axis=1)
-
-                    # del diffs, dist2  # ← 굳이 지울 필요 없음(예외 방지 차 제거)
-
-                newly = hit_any & (~tile_assign)
-                if np.any(newly):
-                    tile_color[newly] = label_colors[label]
-                    tile_assign[newly] = True
-
-                # 타일 내 모든 픽셀 배정 완료되면 조기 종료
-                if np.all(tile_assign):
-                    break
-
-            # 타일 결과 반영
-            flat_out = result[y0:y1, x0:x1].reshape(-1, 3)
-            flat_out[idx_map] = tile_color
-            assigned[y0:y1, x0:x1] |= remain_mask_tile
-
-    # --- (B) 업스케일 ---
-    if scale != 1.0:
-        # 최근접 업스케일로 경계 보존
-        return cv2.resize(result, (w, h), interpolation=cv2.INTER_NEAREST)
-    return result
 
+def frame_verdict(stats):
+    """LabelStats → "NG"/"OK" (불량 비율 기준 또는 min_area 이상 불량 영역 존재 시 NG)"""
+    ng = stats.defect_ratio >= DEFECT_RATIO_THRESHOLD or stats.defect_blobs > 0
+    return "NG" if ng else "OK"
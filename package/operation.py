@@ -10,21 +10,57 @@ COLOR_JSON_PATH = DATA_DIR / "color_defs.json"
 DRAW_POINT_RADIUS = 4
 DRAW_POINT_LIMIT = 200
 UI_UPDATE_INTERVAL = 1000   # 🔥 UI 갱신 주기 → 1초로 늘려서 버벅임 완화
+PIXMAP_CACHE_SIZE = 32      # 표시용 QPixmap 캐시 개수 (프레임 × 오버레이 버전)
+FRAME_CACHE_BYTES = 512 * 1024 ** 2     # 디코딩된 프레임 + 라벨맵 캐시 한도 (바이트)
+PREFETCH_AHEAD = 4          # 다음 버튼 방향으로 미리 읽고 분류해 둘 프레임 수
 
 # === 픽셀맵 파라미터 ===
-PIXEL_MAP_MAX_SIDE = 256    # 🔥 분류맵 계산용 최대 해상도 축소 (성능 개선)
+PIXEL_MAP_WORKERS = 0       # 분류 워커 스레드 수 (0 = CPU 코어 수)
+PIXEL_MAP_BAND_ROWS = 128   # 워커 하나가 한 번에 처리하는 행 수
+
+# === 판정(배치 분류) 파라미터 ===
+DEFECT_RATIO_THRESHOLD = 0.01   # 불량 면적 비율이 이 이상이면 NG
+DEFECT_MIN_BLOB_AREA = 20       # 이 픽셀 수 이상인 불량 연결 영역이 있으면 NG
 
 # === Sphere 기본 반경 ===
 SPHERE_RADIUS = 30
 
 # === 캡처 관련 ===
+CAPTURE_MODE = "batch"      # "batch": CAPTURE_COUNT장 촬영 후 대기 / "stream": 무한 촬영
 CAPTURE_COUNT = 100
+STREAM_MAX_FILES = 1000     # 스트리밍: 보관할 최대 프레임 수 (0 = 제한 없음)
+STREAM_MAX_BYTES = 2 * 1024 ** 3    # 스트리밍: 보관할 최대 총 용량 (0 = 제한 없음)
 CAPTURE_TIMEOUT = 5000
+STORAGE_FORMAT = "jpeg"     # 프레임 저장 포맷: "jpeg" | "png" (무손실) | "npy" (무압축, 디코딩 없음)
 JPEG_QUALITY = 90
+PNG_COMPRESSION = 1         # 0~9, 낮을수록 빠름
 INTERVAL_SEC = 0.1
+ENCODER_THREADS = 2         # 인코딩/저장 워커 스레드 수
+WRITE_QUEUE_SIZE = 16       # 저장 대기 프레임 최대 개수
+WRITE_QUEUE_TIMEOUT = 0.05  # 큐가 찼을 때 캡처 루프가 기다리는 최대 시간(초) → 이후 드롭
+
+# === 캡처 단계별 계측 ===
+STATS_WINDOW = 500                  # 단계별 최근 N개 측정값으로 p50/p95/p99 계산
+STATS_INTERVAL = 5.0                # 요약 출력/JSON 갱신 주기(초), 0 = 끔
+STATS_JSON_PATH = DATA_DIR / "capture_stats.json"
+
+# === 공유 메모리 프레임 링 (캡처 → UI) ===
+RING_SLOTS = 16                     # 링 버퍼 슬롯 수 (최근 N장 보관)
+RING_SLOT_BYTES = 4 * 1024 * 1024   # 슬롯 하나의 최대 프레임 크기 (h*w*3)
+SAVE_JPEG = True                    # 링 사용 시에도 파일(STORAGE_FORMAT)로 보관할지 (비동기 저장)
 
 # === 카메라 관련 ===
+CAMERA_SOURCE = "pylon"     # "pylon[:event|poll]" | "synthetic[:WxH][@FPS]" | "replay:DIR[@FPS]"
+CAMERA_GRAB_MODE = "event"  # "event": pylon 콜백(카메라가 타이밍 결정) / "poll": RetrieveResult + 간격 sleep
+CAMERA_BUFFER_COUNT = 10    # pylon 그랩 버퍼 수 = 콜백 → 캡처 루프 대기열 길이
+CAMERA_FPS = 10.0           # 카메라 프레임레이트 (AcquisitionFrameRate), 0 = 카메라 설정 그대로 (트리거 등)
 CAMERA_BINNING_H = 2
 CAMERA_BINNING_V = 2
 CAMERA_DECIM_H = 2
 CAMERA_DECIM_V = 2
+CAPTURE_DOWNSCALE = 4       # 센서 대비 최종 축소 배율. 하드웨어 binning×decimation이 모자란 만큼만 소프트웨어 축소
+
+# === 가상 카메라 (하드웨어 없이 테스트) ===
+SIM_WIDTH = 1224
+SIM_HEIGHT = 1024
+SIM_FPS = 10                # 0 = 최대 속도
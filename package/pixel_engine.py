@@ -0,0 +1,66 @@
+# package/pixel_engine.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from package.operation import PIXEL_MAP_WORKERS, PIXEL_MAP_BAND_ROWS
+
+
+class PixelEngine:
+    """
+    라벨 LUT 분류를 행 밴드 단위로 나눠 스레드 풀에서 병렬 실행.
+    - 입력 이미지와 출력 라벨맵은 모든 워커가 공유 (밴드별로 겹치지 않게 기록)
+    - numpy gather는 GIL을 풀기 때문에 스레드만으로 멀티코어 활용
+    - 결과는 직렬 경로(ColorLUT.classify)와 비트 단위로 동일
+    """
+
+    def __init__(self, workers=PIXEL_MAP_WORKERS, band_rows=PIXEL_MAP_BAND_ROWS):
+        self.workers = int(workers) or (os.cpu_count() or 1)
+        self.band_rows = max(1, int(band_rows))
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # 풀은 첫 사용 시 한 번만 만들고 계속 재사용
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="pixel-engine")
+            return self._pool
+
+    def classify(self, lut, img_bgr, out=None):
+        """BGR 이미지 → (h,w) uint8 라벨 인덱스 맵"""
+        h = img_bgr.shape[0]
+        if out is None:
+            out = np.empty(img_bgr.shape[:2], dtype=np.uint8)
+
+        # 워커 1개이거나 밴드가 하나뿐이면 직렬 경로
+        if self.workers <= 1 or h <= self.band_rows:
+            return lut.classify(img_bgr, out=out)
+
+        bands = [(y0, min(y0 + self.band_rows, h)) for y0 in range(0, h, self.band_rows)]
+        futures = [
+            self._get_pool().submit(lut.classify, img_bgr[y0:y1], out[y0:y1])
+            for y0, y1 in bands
+        ]
+        for f in futures:
+            f.result()
+        return out
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+_ENGINE = None
+
+
+def get_engine():
+    """프로세스 공용 PixelEngine (operation.py 설정 사용)"""
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = PixelEngine()
+    return _ENGINE
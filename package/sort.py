@@ -0,0 +1,176 @@
+# package/sort.py
+"""
+헤드리스 배치 분류기.
+
+    python -m package.sort                       # PICTURE_DIR의 프레임 (capture.json의 포맷)
+    python -m package.sort D:/shots "run1/*.jpg" -o result.jsonl --save-maps maps/
+
+COLOR_DEFS는 워커마다 한 번만 로드(사이드카 LUT memmap 공유)하고,
+프레임별 판정을 CSV/JSONL로 기록한 뒤 처리량(frames/s)을 출력한다.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+
+# === 루트 경로 추가 (스크립트로 직접 실행하는 경우) ===
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from package.operation import PICTURE_DIR, COLOR_JSON_PATH, DEFECT_MIN_BLOB_AREA
+from package.color_utils import load_defs, get_compiled_lut
+from package.pixel_engine import PixelEngine
+from package.image_utils import label_stats, frame_verdict
+from package.frame_io import frame_files, read_frame
+
+FIELDS = [
+    "file", "width", "height", "verdict",
+    "unknown", "background", "defect", "product",
+    "defect_blobs", "max_defect_blob", "ms",
+]
+
+# 워커 프로세스 전역 상태
+_ENGINE = None
+_MAPS_DIR = None
+
+
+# =========================
+# 입력 수집
+# =========================
+def collect_frames(inputs):
+    """디렉터리 / 글롭 패턴 / 파일 목록 → 정렬된 프레임 경로 목록"""
+    files = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            files.extend(frame_files(p))
+        elif p.is_file():
+            files.append(p)
+        else:
+            files.extend(sorted(Path(f) for f in glob.glob(item)))
+    return files
+
+
+# =========================
+# 워커
+# =========================
+def _init_worker(defs_path, maps_dir):
+    """워커 초기화: 색상 정의 1회 로드, 프로세스당 분류 스레드 1개"""
+    global _ENGINE, _MAPS_DIR
+    load_defs(defs_path)
+    _ENGINE = PixelEngine(workers=1)
+    _MAPS_DIR = Path(maps_dir) if maps_dir else None
+
+
+def _classify_file(path):
+    """프레임 한 장 디코딩 → 분류 → 판정 dict"""
+    t0 = time.perf_counter()
+    path = Path(path)
+    img = read_frame(path, mmap=True)
+    if img is None:
+        return {"file": str(path), "verdict": "error"}
+
+    label_map = _ENGINE.classify(get_compiled_lut(), img)
+    stats = label_stats(label_map, min_area=DEFECT_MIN_BLOB_AREA)
+
+    if _MAPS_DIR is not None:
+        out = _MAPS_DIR / f"{path.stem}_labels.png"
+        cv2.imencode(".png", label_map)[1].tofile(str(out))
+
+    row = {
+        "file": str(path),
+        "width": img.shape[1],
+        "height": img.shape[0],
+        "verdict": frame_verdict(stats),
+    }
+    row.update({k: round(v, 6) for k, v in stats.fractions.items()})
+    row["defect_blobs"] = stats.defect_blobs
+    row["max_defect_blob"] = int(stats.defect_areas[0]) if stats.defect_blobs else 0
+    row["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return row
+
+
+# =========================
+# 결과 기록
+# =========================
+def _open_writer(out_path):
+    """확장자(.csv / .jsonl)에 맞는 (파일, write(row)) 반환"""
+    f = open(out_path, "w", encoding="utf-8", newline="")
+    if Path(out_path).suffix.lower() == ".jsonl":
+        def write(row):
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    else:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        write = writer.writerow
+    return f, write
+
+
+def run(files, out_path, workers=0, defs_path=COLOR_JSON_PATH, maps_dir=None):
+    """files를 병렬 분류해 out_path에 기록 → (처리 장수, 경과 초, NG 장수)"""
+    workers = int(workers) or (os.cpu_count() or 1)
+    if maps_dir:
+        Path(maps_dir).mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    n_done = n_ng = 0
+    f, write = _open_writer(out_path)
+    pool = None
+    try:
+        if workers <= 1:
+            _init_worker(defs_path, maps_dir)
+            results = map(_classify_file, files)
+        else:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(str(defs_path), str(maps_dir) if maps_dir else None),
+            )
+            chunk = max(1, len(files) // (workers * 4))
+            results = pool.map(_classify_file, [str(p) for p in files], chunksize=chunk)
+
+        for row in results:
+            write(row)
+            n_done += 1
+            n_ng += row["verdict"] == "NG"
+    finally:
+        if pool is not None:
+            # 예외로 빠져나와도 워커 프로세스를 남기지 않음 (남은 작업은 취소)
+            pool.shutdown(cancel_futures=True)
+        f.close()
+    return n_done, time.perf_counter() - t0, n_ng
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="COLOR_DEFS 기반 헤드리스 배치 분류")
+    ap.add_argument("inputs", nargs="*", default=[str(PICTURE_DIR)],
+                    help="디렉터리(frame_*, capture.json의 포맷) / 글롭 패턴 / 파일 (기본: PICTURE_DIR)")
+    ap.add_argument("-o", "--out", default="sort_results.csv",
+                    help="판정 결과 파일 (.csv 또는 .jsonl)")
+    ap.add_argument("-j", "--workers", type=int, default=0,
+                    help="프로세스 수 (0 = CPU 코어 수, 1 = 단일 프로세스)")
+    ap.add_argument("--defs", default=str(COLOR_JSON_PATH), help="색상 정의 JSON 경로")
+    ap.add_argument("--save-maps", metavar="DIR", help="라벨맵 PNG 저장 폴더")
+    args = ap.parse_args(argv)
+
+    files = collect_frames(args.inputs)
+    if not files:
+        print("⚠️ 분류할 프레임이 없습니다")
+        return 1
+
+    n, elapsed, n_ng = run(files, args.out, args.workers, args.defs, args.save_maps)
+    fps = n / elapsed if elapsed > 0 else float("inf")
+    print(f"분류 완료: {n}장 / {elapsed:.2f}s → {fps:.1f} frames/s (NG {n_ng}장) → {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# package/sphere_index.py
+import numpy as np
+
+# =========================
+# 격자 파라미터
+# =========================
+CELL_SIZE = 16                      # 한 셀의 RGB 한 변 길이
+GRID_SIDE = 256 // CELL_SIZE        # 축당 셀 개수
+POINT_CHUNK = 1 << 20               # 한 번에 비교할 (점 × 후보 구) 최대 개수
+
+
+def _cell_ids(points):
+    """(N,3) int 좌표 → (N,) 셀 번호 (0~255 범위 밖은 -1)"""
+    inside = np.all((points >= 0) & (points < 256), axis=1)
+    cells = points // CELL_SIZE
+    ids = (cells[:, 0] * GRID_SIDE + cells[:, 1]) * GRID_SIDE + cells[:, 2]
+    return np.where(inside, ids, -1)
+
+
+class SphereIndex:
+    """
+    색상 구 집합을 RGB 복셀 격자에 버킷팅한 공간 인덱스.
+    - 각 셀은 바운딩 큐브가 겹치는 구 번호만 보유 (정의 순서 유지)
+    - 질의는 해당 셀의 후보 구만 검사 → classify_rgb와 동일한 first-match 결과
+    """
+
+    def __init__(self, defs):
+        self.labels = list(defs.keys())
+        centers, radii, label_ids = [], [], []
+        for li, spheres in enumerate(defs.values()):
+            for center, radius in spheres:
+                centers.append([int(c) for c in center])
+                radii.append(abs(int(radius)))
+                label_ids.append(li)
+
+        # 정의 순서(= first-match 순서)대로 평탄화
+        self.centers = np.array(centers, dtype=np.int32).reshape(-1, 3)
+        radii = np.array(radii, dtype=np.int32)
+        self.radii2 = radii * radii
+        self.label_ids = np.array(label_ids, dtype=np.int32)
+        # 마지막 칸은 unknown
+        self._names = np.array(self.labels + ["unknown"], dtype=object)
+        # 단일 질의용 파이썬 튜플 (numpy 호출 오버헤드 회피)
+        self._spheres = [(int(c[0]), int(c[1]), int(c[2]), int(r2), self.labels[li])
+                         for c, r2, li in zip(self.centers, self.radii2, self.label_ids)]
+
+        # 구별 바운딩 큐브가 걸치는 셀 목록 → CSR(cell_start, cell_items)
+        lo = np.clip(self.centers - radii[:, None], 0, 255) // CELL_SIZE
+        hi = np.clip(self.centers + radii[:, None], 0, 255) // CELL_SIZE
+        cell_lists, owner_lists = [], []
+        for i in range(len(radii)):
+            if np.any(self.centers[i] + radii[i] < 0) or np.any(self.centers[i] - radii[i] > 255):
+                continue  # 격자 밖 구는 범위 밖 질의(전체 검사)에서만 유효
+            r = np.arange(lo[i, 0], hi[i, 0] + 1)
+            g = np.arange(lo[i, 1], hi[i, 1] + 1)
+            b = np.arange(lo[i, 2], hi[i, 2] + 1)
+            ids = ((r[:, None, None] * GRID_SIDE + g[None, :, None]) * GRID_SIDE + b[None, None, :]).ravel()
+            cell_lists.append(ids)
+            owner_lists.append(np.full(ids.size, i, dtype=np.int32))
+
+        if cell_lists:
+            cells = np.concatenate(cell_lists)
+            owners = np.concatenate(owner_lists)
+            # 셀 번호로 안정 정렬 → 셀 내부는 정의 순서 유지
+            order = np.argsort(cells, kind="stable")
+            cells, self.cell_items = cells[order], owners[order]
+        else:
+            cells = np.zeros(0, dtype=np.int64)
+            self.cell_items = np.zeros(0, dtype=np.int32)
+        self.cell_start = np.searchsorted(cells, np.arange(GRID_SIDE ** 3 + 1))
+
+    def __len__(self):
+        return len(self.radii2)
+
+    def _candidates(self, cell):
+        """셀 번호 → 후보 구 번호 (범위 밖 셀(-1)은 전체)"""
+        if cell < 0:
+            return np.arange(len(self.radii2))
+        return self.cell_items[self.cell_start[cell]:self.cell_start[cell + 1]]
+
+    def _first_hit(self, points, cand):
+        """(n,3) 점들 × 후보 구 → 점별 label_id (없으면 len(labels))"""
+        out = np.full(len(points), len(self.labels), dtype=np.int32)
+        if cand.size == 0:
+            return out
+        centers = self.centers[cand]
+        radii2 = self.radii2[cand]
+        # (n,K,3) 임시 배열이 커지지 않도록 점을 나눠 계산
+        step = max(1, POINT_CHUNK // cand.size)
+        for p0 in range(0, len(points), step):
+            diffs = points[p0:p0 + step, None, :] - centers[None, :, :]
+            hit = np.einsum("ijk,ijk->ij", diffs, diffs) <= radii2[None, :]
+            any_hit = hit.any(axis=1)
+            first = hit.argmax(axis=1)
+            out[p0:p0 + step][any_hit] = self.label_ids[cand[first[any_hit]]]
+        return out
+
+    def classify(self, rgb):
+        """단일 (r,g,b) → 라벨 이름 ('unknown' 포함)"""
+        r, g, b = (int(v) for v in rgb)
+        if 0 <= r < 256 and 0 <= g < 256 and 0 <= b < 256:
+            cell = ((r // CELL_SIZE) * GRID_SIDE + g // CELL_SIZE) * GRID_SIDE + b // CELL_SIZE
+            cand = self.cell_items[self.cell_start[cell]:self.cell_start[cell + 1]].tolist()
+        else:
+            cand = range(len(self._spheres))
+        for i in cand:
+            cr, cg, cb, rad2, label = self._spheres[i]
+            dr, dg, db = r - cr, g - cg, b - cb
+            if dr * dr + dg * dg + db * db <= rad2:
+                return label
+        return "unknown"
+
+    def classify_batch(self, points):
+        """(N,3) RGB 배열 → (N,) 라벨 이름 배열 (셀 단위로 묶어 벡터화)"""
+        pts = np.asarray(points, dtype=np.int32).reshape(-1, 3)
+        out = np.full(len(pts), len(self.labels), dtype=np.int32)
+        if len(pts) == 0 or len(self.radii2) == 0:
+            return self._names[out]
+
+        cells = _cell_ids(pts)
+        order = np.argsort(cells, kind="stable")
+        uniq, starts = np.unique(cells[order], return_index=True)
+        bounds = np.append(starts, len(order))
+        for k, cell in enumerate(uniq):
+            sel = order[bounds[k]:bounds[k + 1]]
+            out[sel] = self._first_hit(pts[sel], self._candidates(int(cell)))
+        return self._names[out]
@@ -1,18 +1,101 @@
+import bisect
+from collections import deque
 from pathlib import Path
 from PyQt5 import QtWidgets, QtGui, QtCore, uic
 import cv2
 import numpy as np
 
-from package.image_utils import to_pixmap, draw_points, highlight_rgb, make_pixel_map
-from package.color_utils import add_color_def, save_defs, clear_defs
+from package.image_utils import (
+    to_pixmap, PixmapCache, rgb_mask, highlight_rgb, make_label_map, colorize_label_map
+)
+from package.color_utils import add_color_def, save_defs, clear_defs, lut_snapshot
+from package.frame_events import capture_request_event
+from package.frame_ring import FrameRing
+from package.frame_io import frame_files, read_frame, reset_dir, META_NAME
+from package.frame_cache import FrameCache, Prefetcher
 from package.operation import (
     DRAW_POINT_RADIUS, DRAW_POINT_LIMIT, UI_UPDATE_INTERVAL,
-    SPHERE_RADIUS, PICTURE_DIR
+    SPHERE_RADIUS, PICTURE_DIR, PREFETCH_AHEAD
 )
 
 UI_FILE = Path(__file__).resolve().with_name("mainwindow.ui")
 
 
+def _read_frame(fpath, ring, seq):
+    """링에 아직 남아 있으면 공유 메모리에서 복사, 아니면 파일에서 (저장 포맷에 맞게) 읽기"""
+    if ring is not None and seq is not None:
+        frame = ring.read(seq)
+        if frame is not None:
+            return frame[0]
+    return read_frame(fpath)
+
+
+class _EventBridge(QtCore.QObject):
+    """이벤트 수신 스레드 → Qt 이벤트 루프로 캡처 이벤트 전달"""
+    received = QtCore.pyqtSignal(object)
+
+
+class _PixelMapSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(int, object, object)   # (세대, 라벨맵, 표시용 컬러맵)
+
+
+class _PixelMapJob(QtCore.QRunnable):
+    """
+    라벨맵 계산 작업 (QThreadPool 워커에서 실행).
+    - lut: GUI 스레드에서 뜬 LUT 스냅숏 (이후 정의가 바뀌어도 수정되지 않음)
+    - 시작 전/계산 후 세대가 바뀌었으면(새 프레임/새 정의) 결과를 버림.
+    """
+
+    def __init__(self, generation, img, lut, latest, signals):
+        super().__init__()
+        self.generation = generation
+        self.img = img
+        self.lut = lut
+        self.latest = latest        # () → 현재 세대
+        self.signals = signals
+
+    def run(self):
+        if self.generation != self.latest():
+            return
+        label_map = make_label_map(self.img, self.lut)
+        if self.generation != self.latest():
+            return
+        self.signals.done.emit(self.generation, label_map, colorize_label_map(label_map))
+
+
+class _StrokeOverlay:
+    """
+    씬 위의 드래그 자취 레이어: 점마다 작은 원 아이템 하나 (사진 위 z=1).
+    점 추가/오래된 점 제거가 O(1) → 이미지 크기·점 개수와 무관.
+    """
+
+    def __init__(self, scene, limit=DRAW_POINT_LIMIT, color=QtGui.QColor(255, 0, 0)):
+        self.scene = scene
+        self._items = deque()
+        self._limit = max(1, int(limit))
+        self._pen = QtGui.QPen(QtCore.Qt.NoPen)
+        self._brush = QtGui.QBrush(color)
+
+    def add(self, x, y, radius):
+        item = self.scene.addEllipse(x - radius, y - radius, 2 * radius, 2 * radius,
+                                     self._pen, self._brush)
+        item.setZValue(1)
+        self._items.append(item)
+        if len(self._items) > self._limit:
+            self._remove(self._items.popleft())
+
+    def _remove(self, item):
+        try:
+            if item.scene() is not None:
+                self.scene.removeItem(item)
+        except RuntimeError:
+            pass    # scene.clear()로 이미 삭제됨
+
+    def clear(self):
+        while self._items:
+            self._remove(self._items.popleft())
+
+
 class PhotoViewer(QtWidgets.QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -23,8 +106,32 @@ class PhotoViewer(QtWidgets.QDialog):
         self.selected_points = []
         self.pending_colors = {}          # {label: set(RGB)}
         self.current_img = None           # 좌측 원본
-        self.current_pixel_map = None     # 우측 분류 결과 원본(BGR)
+        self.current_path = None          # 좌측 원본 파일 (표시 캐시 키)
+        self.current_label_map = None     # 우측 분류 결과 (h,w) 라벨 인덱스
+        self.current_pixel_map = None     # 우측 분류 결과 표시용 컬러(BGR)
         self.cap_proc = None              # main.py에서 주입
+        self.events = None                # 캡처 이벤트 채널 (attach_events)
+        self.ring = None                  # 캡처 공유 메모리 링 (ring 이벤트로 접속)
+        self._frame_seqs = {}             # {파일 경로: 링 seq}
+        self._frame_ids = {}              # {파일 경로: 카메라 프레임 번호} (frame 이벤트)
+        self._ring_only = set()           # 파일로 저장되지 않는 링 전용 프레임 경로
+
+        # === 픽셀맵 백그라운드 계산 (최신 요청만 반영) ===
+        self._map_gen = 0                 # 요청마다 증가, 결과는 같은 세대일 때만 표시
+        self._map_job = None
+        self._map_pool = QtCore.QThreadPool(self)
+        self._map_pool.setMaxThreadCount(1)   # 분류 자체는 PixelEngine이 병렬 처리
+        self._map_signals = _PixelMapSignals(self)
+        self._map_signals.done.connect(self._on_pixel_map)
+        self._map_request_key = None      # 요청 중인 결과의 캐시 키 (경로, "labels", 정의 버전)
+        self._map_key = None              # 표시 중인 결과의 캐시 키
+
+        # === 표시용 QPixmap 캐시 (같은 사진/분류맵 재표시 시 재변환 없음) ===
+        self._pixmaps = PixmapCache(QtGui)
+
+        # === 디코딩 프레임/라벨맵 캐시 + 다음 프레임 미리 읽기 ===
+        self._frame_cache = FrameCache()
+        self._prefetcher = Prefetcher(self._frame_cache)
 
         # === 왼쪽(real_photo) : 원본 ===
         self.scene = QtWidgets.QGraphicsScene(self)
@@ -36,6 +143,10 @@ class PhotoViewer(QtWidgets.QDialog):
         self.pixel_view.setScene(self.pixel_scene)
         self.pixelmap_item = None
 
+        # === 드래그 자취 오버레이 (사진은 그대로 두고 점 아이템만 추가) ===
+        self._stroke_left = _StrokeOverlay(self.scene)
+        self._stroke_right = _StrokeOverlay(self.pixel_scene)
+
         self.files = self._scan_files()
         self.index = 0
 
@@ -61,47 +172,210 @@ class PhotoViewer(QtWidgets.QDialog):
             self._show_message("폴더가 비어 있습니다")
 
     # -------------------------------
+    def attach_events(self, server):
+        """캡처 이벤트 채널 연결 → 폴더 주기 스캔 중단, 이벤트로 파일 목록 갱신"""
+        self.events = server
+        self._event_bridge = _EventBridge(self)
+        self._event_bridge.received.connect(self.on_capture_event)
+        server.on_event = self._event_bridge.received.emit
+        self.timer.stop()
+
+    def on_capture_event(self, event):
+        kind = event.get("type")
+        if kind == "reset":
+            # 캡처 프로세스가 폴더를 새로 만듦 → 기존 목록 폐기
+            self.files, self.index = [], 0
+            self._frame_seqs.clear()
+            self._frame_ids.clear()
+            self._ring_only.clear()
+            self._pixmaps.clear()       # 같은 파일 이름이 새 프레임으로 다시 쓰임
+            self._prefetcher.cancel()
+            self._frame_cache.clear()
+            self.current_img = None
+            self._show_message("폴더가 비어 있습니다")
+            self.update_pixel_view()    # 진행 중인 계산 무시 + 오른쪽 비움
+        elif kind == "ring":
+            if self.ring is not None:
+                self._prefetcher.cancel(wait=True)     # 미리 읽기가 이전 링을 다 쓴 뒤에 닫음
+                self.ring.close()
+            try:
+                self.ring = FrameRing.attach(event["name"])
+            except Exception as e:
+                self.ring = None
+                print(f"⚠️ 공유 메모리 링 접속 실패: {e}")
+        elif kind == "frame":
+            path = Path(event["path"])
+            if event.get("seq") is not None:
+                self._frame_seqs[path] = event["seq"]
+            if event.get("frame_id") is not None:
+                self._frame_ids[path] = event["frame_id"]
+                if not event.get("saved", True):
+                    self._ring_only.add(path)
+            if path not in self.files:
+                bisect.insort(self.files, path)
+            if path in self._ring_only:
+                self._drop_overwritten()
+                if path not in self.files:
+                    return      # 이벤트가 닿기 전에 이미 덮어쓰임
+            # 첫 프레임이면 바로 표시
+            if self.current_img is None:
+                self.index = self.files.index(path)
+                self.show_photo(path)
+        elif kind == "batch_done":
+            print(f"📷 촬영 완료: {event.get('count')}장")
+        elif kind == "evict":
+            # 스트리밍 롤링 윈도에서 삭제된 오래된 프레임 → 목록에서 제거
+            self._drop_paths(map(Path, event["paths"]))
+        elif kind == "verdict":
+            if event.get("verdict") == "NG":
+                print(f"❌ NG: {Path(event['path']).name} (불량 {event['defect_ratio']:.2%})")
+
+    def _drop_paths(self, paths):
+        """더 이상 읽을 수 없는 프레임을 목록/캐시에서 제거 (현재 위치 유지)"""
+        for path in paths:
+            self._frame_seqs.pop(path, None)
+            self._frame_ids.pop(path, None)
+            self._ring_only.discard(path)
+            self._pixmaps.discard(path)
+            self._frame_cache.discard(path)
+            if path in self.files:
+                if self.files.index(path) < self.index:
+                    self.index -= 1
+                self.files.remove(path)
+        self.index = max(0, min(self.index, len(self.files) - 1))
+
+    def _drop_overwritten(self):
+        """링 슬롯이 덮어쓰인 링 전용 프레임 제거 (파일이 없으므로 다시 읽을 방법이 없음)"""
+        if self.ring is None:
+            return
+        gone = [p for p in self._ring_only if not self.ring.is_valid(self._frame_seqs[p])]
+        if gone:
+            self._drop_paths(gone)
+
     def _scan_files(self):
         PICTURE_DIR.mkdir(parents=True, exist_ok=True)
-        return sorted(PICTURE_DIR.glob("frame_*.jpg"))
+        return frame_files(PICTURE_DIR)
 
     def _show_message(self, text: str):
+        self._stroke_left.clear()
         self.scene.clear()
+        self.pixmap_item = None
         self.scene.addText(text, QtGui.QFont("Arial", 14))
 
+    def _set_photo_pixmap(self, pixmap):
+        """왼쪽 사진 교체 (아이템 재사용 → 오버레이 유지)"""
+        if self.pixmap_item is None:
+            self.scene.clear()      # 안내 문구 제거
+            self.pixmap_item = self.scene.addPixmap(pixmap)
+            self.pixmap_item.setAcceptedMouseButtons(QtCore.Qt.NoButton)
+        else:
+            self.pixmap_item.setPixmap(pixmap)
+
+    def _set_pixel_pixmap(self, pixmap):
+        """오른쪽 분류 결과 교체 (None = 비움)"""
+        if pixmap is None:
+            if self.pixelmap_item is not None:
+                self.pixel_scene.removeItem(self.pixelmap_item)
+                self.pixelmap_item = None
+            return
+        if self.pixelmap_item is None:
+            self.pixelmap_item = self.pixel_scene.addPixmap(pixmap)
+        else:
+            self.pixelmap_item.setPixmap(pixmap)
+        self.pixel_view.fitInView(self.pixelmap_item, QtCore.Qt.KeepAspectRatio)
+
     # === 오른쪽 뷰 갱신 헬퍼 ===
     def update_pixel_view(self):
-        """픽셀맵을 생성하고 오른쪽 뷰에 표시."""
+        """픽셀맵 계산을 워커에 요청 (이전 요청은 취소/무시). 결과는 _on_pixel_map에서 표시."""
+        self._map_gen += 1
+        if self._map_job is not None:
+            self._map_pool.tryTake(self._map_job)   # 아직 시작 안 했으면 취소
+            self._map_job = None
         if self.current_img is None:
-            self.pixel_scene.clear()
+            self._stroke_right.clear()
+            self._set_pixel_pixmap(None)
+            self.current_label_map = None
             self.current_pixel_map = None
+            self._map_key = None
             return
-        # 🔷 우측 분류맵 계산 & 보관
-        self.current_pixel_map = make_pixel_map(self.current_img)
-        pixmap2 = to_pixmap(self.current_pixel_map, QtGui)
-        self.pixel_scene.clear()
-        self.pixelmap_item = self.pixel_scene.addPixmap(pixmap2)
-        self.pixel_view.fitInView(self.pixelmap_item, QtCore.Qt.KeepAspectRatio)
+        version, lut = lut_snapshot()
+        self._map_request_key = (self.current_path, "labels", version)
+        label_map = self._frame_cache.get_labels(self.current_path, version)
+        if label_map is not None:
+            # 이미 계산된 프레임 (미리 읽기 / 이전 방문) → 바로 표시
+            self._on_pixel_map(self._map_gen, label_map, colorize_label_map(label_map))
+            return
+        job = _PixelMapJob(self._map_gen, self.current_img, lut, lambda: self._map_gen, self._map_signals)
+        job.setAutoDelete(False)    # tryTake 대비 참조 유지
+        self._map_job = job
+        self._map_pool.start(job)
+
+    def _on_pixel_map(self, generation, label_map, pixel_map):
+        if generation != self._map_gen:
+            return      # 그새 다른 프레임/정의로 바뀜
+        self._map_job = None
+        path, _, version = self._map_request_key
+        self._frame_cache.put_labels(path, version, label_map)
+        # 🔷 우측 라벨맵 보관 (색칠은 표시용으로만)
+        self.current_label_map = label_map
+        self.current_pixel_map = pixel_map
+        self._map_key = self._map_request_key
+        self._show_pixel_map()
+
+    def _show_pixel_map(self):
+        """보관 중인 컬러맵을 오른쪽 뷰에 표시 (재계산 없음)"""
+        if self.current_pixel_map is None:
+            self._set_pixel_pixmap(None)
+        else:
+            pixel_map = self.current_pixel_map
+            self._set_pixel_pixmap(self._pixmaps.get(self._map_key, lambda: pixel_map))
+
+    def _load_frame(self, fpath: Path):
+        return _read_frame(fpath, self.ring, self._frame_seqs.get(fpath))
 
     def show_photo(self, fpath: Path):
-        img = cv2.imread(str(fpath))
+        img = self._frame_cache.get_frame(fpath)
         if img is None:
-            self._show_message(f"이미지를 불러올 수 없습니다:\n{fpath.name}")
-            return
+            img = self._load_frame(fpath)
+            if img is None:
+                self._show_message(f"이미지를 불러올 수 없습니다:\n{fpath.name}")
+                return
+            self._frame_cache.put_frame(fpath, img)
         self.current_img = img
+        self.current_path = fpath
+        frame_id = self._frame_ids.get(fpath)
+        self.setWindowTitle(fpath.name if frame_id is None else f"{fpath.name} (카메라 #{frame_id})")
+        # 이전 프레임의 분류 결과는 새 결과가 올 때까지 숨김 (다른 프레임과 섞이지 않도록)
+        self.current_label_map = None
+        self.current_pixel_map = None
+        self._map_key = None
+        self._show_pixel_map()
 
         # 왼쪽: 원본
-        pixmap = to_pixmap(img, QtGui)
-        self.scene.clear()
-        self.pixmap_item = self.scene.addPixmap(pixmap)
-        self.pixmap_item.setAcceptedMouseButtons(QtCore.Qt.NoButton)
+        self._stroke_left.clear()
+        self._stroke_right.clear()
+        self._set_photo_pixmap(self._pixmaps.get((fpath, "photo"), lambda: img))
         self.real_photo.fitInView(self.pixmap_item, QtCore.Qt.KeepAspectRatio)
 
-        # 오른쪽: 분류 결과
+        # 오른쪽: 분류 결과 (백그라운드)
         self.update_pixel_view()
+        self._prefetch_ahead()
+
+    def _prefetch_ahead(self):
+        """다음 버튼으로 볼 프레임 PREFETCH_AHEAD장을 백그라운드에서 읽고 분류"""
+        if not self.files or self.current_path not in self.files:
+            return
+        i = self.files.index(self.current_path)
+        n = min(PREFETCH_AHEAD, len(self.files) - 1)
+        paths = [self.files[(i + k) % len(self.files)] for k in range(1, n + 1)]
+        # 워커는 self.ring/self._frame_seqs 대신 지금의 링 핸들과 seq 사본만 사용
+        ring, seqs = self.ring, {p: self._frame_seqs.get(p) for p in paths}
+        self._prefetcher.request(paths, loader=lambda p: _read_frame(p, ring, seqs[p]),
+                                 snapshot=lut_snapshot())
 
     def next_photo(self):
-        self.files = self._scan_files()
+        if self.events is None:
+            self.files = self._scan_files()
         if not self.files:
             self._show_message("폴더가 비어 있습니다")
             return
@@ -109,15 +383,23 @@ class PhotoViewer(QtWidgets.QDialog):
         self.show_photo(self.files[self.index])
 
     def clear_folder(self):
-        for f in PICTURE_DIR.glob("frame_*.jpg"):
-            try:
-                f.unlink()
-            except Exception:
-                pass
+        # 폴더를 이름 바꾸기로 즉시 비우고 실제 삭제는 백그라운드 (GUI 멈춤 없음)
+        reset_dir(PICTURE_DIR, keep=(META_NAME,))
         self.files, self.index = [], 0
+        self._frame_seqs.clear()
+        self._frame_ids.clear()
+        self._ring_only.clear()
+        self._pixmaps.clear()
+        self._prefetcher.cancel()
+        self._frame_cache.clear()
+        self.current_img = None
         self._show_message("폴더가 비어 있습니다")
-        # 오른쪽도 초기화
-        self.pixel_scene.clear()
+        # 오른쪽도 초기화 (진행 중인 계산 결과도 무시)
+        self.update_pixel_view()
+
+        # 캡처 프로세스에 새 배치 촬영 요청
+        if self.events is not None and not self.events.send(capture_request_event()):
+            print("⚠️ 캡처 프로세스에 촬영 요청 실패 (연결 없음)")
 
     def update_photos(self):
         new_files = self._scan_files()
@@ -145,22 +427,25 @@ class PhotoViewer(QtWidgets.QDialog):
         """Save 버튼 → 임시 RGB를 Sphere로 등록하고 저장 + 오른쪽 즉시 갱신"""
         for label, rgb_set in self.pending_colors.items():
             if rgb_set:
-                for rgb in rgb_set:
-                    add_color_def(label, rgb, radius=SPHERE_RADIUS)
+                add_color_def(label, rgb_set, radius=SPHERE_RADIUS)   # 라벨당 LUT 사본 한 번
                 print(f"[{label}] {len(rgb_set)}개 RGB → Sphere로 등록됨")
         self.pending_colors.clear()
 
         save_defs()
         print("color_defs.json에 저장 완료 ✅")
 
-        # 오른쪽 뷰 즉시 갱신
+        # 오른쪽 뷰 즉시 갱신 (이전 정의로 계산된 라벨맵은 폐기 후 다시 미리 계산)
+        self._frame_cache.drop_stale_labels()
         self.update_pixel_view()
+        self._prefetch_ahead()
 
     def clear_data(self):
         """Data Clear → JSON 초기화 + 오른쪽 즉시 갱신"""
         clear_defs()
         QtWidgets.QMessageBox.information(self, "Data Clear", "저장된 색상 정의가 모두 삭제되었습니다 ✅")
+        self._frame_cache.drop_stale_labels()
         self.update_pixel_view()
+        self._prefetch_ahead()
 
     def safe_exit(self):
         print("🔒 안전 종료 시작")
@@ -170,6 +455,13 @@ class PhotoViewer(QtWidgets.QDialog):
         if self.cap_proc and self.cap_proc.poll() is None:
             self.cap_proc.terminate()
             print("📷 캡쳐 프로세스 종료")
+        self._prefetcher.close()    # 링 닫기 전에 (미리 읽기가 링을 읽을 수 있음)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self._map_gen += 1
+        self._map_pool.clear()
+        self._map_pool.waitForDone(2000)
 
         QtWidgets.QApplication.quit()
 
@@ -180,6 +472,8 @@ class PhotoViewer(QtWidgets.QDialog):
                 if event.button() == QtCore.Qt.LeftButton:
                     self.drawing = True
                     self.selected_points = []
+                    self._stroke_left.clear()
+                    self._stroke_right.clear()
                     return True
 
             elif event.type() == QtCore.QEvent.MouseMove:
@@ -189,55 +483,37 @@ class PhotoViewer(QtWidgets.QDialog):
                     h, w = self.current_img.shape[:2]
                     if 0 <= x < w and 0 <= y < h:
                         self.selected_points.append((x, y))
-                        
-                        # 🔴 (좌) 드래그 자취 오버레이
-                        overlay_left = draw_points(
-                            self.current_img,
-                            self.selected_points[-DRAW_POINT_LIMIT:],
-                            radius=DRAW_POINT_RADIUS
-                        )
-                        pixmap = to_pixmap(overlay_left, QtGui)
-                        self.scene.clear()
-                        self.pixmap_item = self.scene.addPixmap(pixmap)
-                        
-                        # 🔴 (우) 동일 좌표 자취 오버레이
+
+                        # 🔴 (좌) 드래그 자취: 새 점 하나만 추가 (최근 DRAW_POINT_LIMIT개 유지)
+                        self._stroke_left.add(x, y, DRAW_POINT_RADIUS)
+
+                        # 🔴 (우) 동일 좌표 자취
                         if self.current_pixel_map is not None:
                             # 픽셀맵이 다운스케일되었을 수 있으므로 좌표 변환
                             h_pix, w_pix = self.current_pixel_map.shape[:2]
                             scale_x, scale_y = w_pix / w, h_pix / h
-                            # 스케일된 좌표로 변환
-                            scaled_points = [(int(sx * scale_x), int(sy * scale_y)) 
-                                           for (sx, sy) in self.selected_points[-DRAW_POINT_LIMIT:]]
-                            overlay_right = draw_points(
-                                self.current_pixel_map,
-                                scaled_points,
-                                radius=max(1, int(DRAW_POINT_RADIUS * scale_x))
-                            )
-                            pixmap2 = to_pixmap(overlay_right, QtGui)
-                            self.pixel_scene.clear()
-                            self.pixelmap_item = self.pixel_scene.addPixmap(pixmap2)
-                            self.pixel_view.fitInView(self.pixelmap_item, QtCore.Qt.KeepAspectRatio)
+                            self._stroke_right.add(int(x * scale_x), int(y * scale_y),
+                                                   max(1, int(DRAW_POINT_RADIUS * scale_x)))
                     return True
 
             elif event.type() == QtCore.QEvent.MouseButtonRelease:
                 if event.button() == QtCore.Qt.LeftButton and self.current_img is not None:
                     self.drawing = False
+                    self._stroke_left.clear()
+                    self._stroke_right.clear()
                     label = self.get_selected_label()
                     if not label:
                         print("라벨이 선택되지 않았습니다.")
-                        # 가이드 자취 제거 후 우측 분류맵 복구
-                        if self.current_img is not None:
-                            pixmap = to_pixmap(self.current_img, QtGui)
-                            self.scene.clear()
-                            self.pixmap_item = self.scene.addPixmap(pixmap)
-                        self.update_pixel_view()
+                        # 가이드 자취 제거 후 (이전 하이라이트가 있었다면) 원본/우측 분류맵 복구
+                        img = self.current_img
+                        self._set_photo_pixmap(self._pixmaps.get((self.current_path, "photo"), lambda: img))
+                        self._show_pixel_map()
                         return True
 
-                    # 드래그 구간 RGB 수집
+                    # 드래그 구간 RGB 수집 (BGR → RGB는 점마다 뒤집기만)
                     rgb_set = set()
-                    img_rgb = cv2.cvtColor(self.current_img, cv2.COLOR_BGR2RGB)
                     for (x, y) in self.selected_points:
-                        rgb_set.add(tuple(img_rgb[int(y), int(x)]))
+                        rgb_set.add(tuple(int(v) for v in self.current_img[int(y), int(x), ::-1]))
 
                     if label not in self.pending_colors:
                         self.pending_colors[label] = set()
@@ -245,34 +521,24 @@ class PhotoViewer(QtWidgets.QDialog):
 
                     print(f"[{label}] {len(rgb_set)}개 RGB 임시 저장됨")
 
+                    # ✅ 선택 RGB 좌표 마스크 1회 계산 → 좌/우 공용
+                    mask = rgb_mask(self.current_img, rgb_set)
+
                     # ✅ (좌) 같은 RGB 전체 하이라이트
-                    overlay_left = highlight_rgb(self.current_img, rgb_set)
-                    pixmap = to_pixmap(overlay_left, QtGui)
-                    self.scene.clear()
-                    self.pixmap_item = self.scene.addPixmap(pixmap)
-                    
+                    overlay_left = highlight_rgb(self.current_img, rgb_set, mask=mask)
+                    self._set_photo_pixmap(to_pixmap(overlay_left, QtGui))
+
                     # ✅ (우) 좌측과 '동일 좌표 마스크'로 픽셀맵 강조
                     if self.current_pixel_map is not None:
-                        h, w = self.current_img.shape[:2]
                         h_pix, w_pix = self.current_pixel_map.shape[:2]
-                        scale_x, scale_y = w_pix / w, h_pix / h
-                        
-                        # 좌측에서 선택된 RGB에 해당하는 [좌표 마스크] 생성
-                        img_rgb = cv2.cvtColor(self.current_img, cv2.COLOR_BGR2RGB)
-                        mask = np.isin(
-                            img_rgb.reshape(-1, 3).view([('', img_rgb.dtype)] * 3),
-                            np.array(list(rgb_set)).view([('', np.uint8)] * 3)
-                        ).reshape(h, w)
-                        
-                        # 다운스케일된 좌표로 마스크 변환
-                        mask_resized = cv2.resize(mask.astype(np.uint8), (w_pix, h_pix), interpolation=cv2.INTER_NEAREST).astype(bool)
-                        
+                        if mask.shape != (h_pix, w_pix):
+                            # 다운스케일된 좌표로 마스크 변환
+                            mask = cv2.resize(mask.view(np.uint8), (w_pix, h_pix),
+                                              interpolation=cv2.INTER_NEAREST).view(bool)
+
                         overlay_right = self.current_pixel_map.copy()
-                        overlay_right[mask_resized] = (0, 255, 0)  # 초록 강조
-                        pixmap2 = to_pixmap(overlay_right, QtGui)
-                        self.pixel_scene.clear()
-                        self.pixelmap_item = self.pixel_scene.addPixmap(pixmap2)
-                        self.pixel_view.fitInView(self.pixelmap_item, QtCore.Qt.KeepAspectRatio)
-                    
+                        overlay_right[mask] = (0, 255, 0)  # 초록 강조
+                        self._set_pixel_pixmap(to_pixmap(overlay_right, QtGui))
+
                     return True
         return False